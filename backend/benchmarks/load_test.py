@@ -0,0 +1,316 @@
+"""In-process HTTP load test with a latency regression gate.
+
+Drives the real FastAPI ``app`` through httpx's ASGI transport (no server,
+no network) against a throwaway SQLite database, or a Postgres stand-in via
+``--database-url``. OCR is replaced by a canned result unless ``--real-ocr``
+is given. Reports p50/p95/p99 and throughput per endpoint, and exits non-zero
+when the run regresses against the stored baseline by more than ``--threshold``.
+
+Single runs are noisy, so the steady state is repeated ``--runs`` times and
+each statistic is the median across runs. Only p95, throughput and errors are
+gated, and only for endpoints with at least ``--min-samples`` requests per run;
+p99 of a few hundred requests is a handful of samples and is reported only.
+
+Usage (from the backend directory):
+    python -m benchmarks.load_test --requests 2000 --concurrency 20
+    python -m benchmarks.load_test --update-baseline
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+from benchmarks.stats import environment, load_results, save_results, summarize
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_BASELINE = Path(__file__).parent / "baselines" / "load_test.json"
+
+# Relative weights of each operation in the steady-state mix
+MIXES = {
+    "default": {
+        "login": 5,
+        "upload": 10,
+        "list_documents": 35,
+        "list_w2_forms": 25,
+        "list_tax_returns": 15,
+        "create_tax_return": 5,
+        "me": 5,
+    },
+    "polling": {"list_documents": 50, "list_w2_forms": 30, "list_tax_returns": 20},
+    "ingest": {"upload": 70, "list_documents": 30},
+    "auth": {"register": 30, "login": 70},
+}
+
+FAKE_PDF = b"%PDF-1.4\n1 0 obj << /Type /Catalog >> endobj\ntrailer << /Root 1 0 R >>\n%%EOF\n"
+
+CANNED_FIELDS = {
+    "employer_name": "ACME PAYROLL SERVICES INC",
+    "employer_ein": "12-3456789",
+    "employee_ssn": "123-45-6789",
+    "wages_tips_compensation": 55000.0,
+    "federal_income_tax_withheld": 6200.0,
+    "social_security_wages": 55000.0,
+    "social_security_tax_withheld": 3410.0,
+    "medicare_wages": 55000.0,
+    "medicare_tax_withheld": 797.5,
+    "tax_year": 2023,
+}
+
+
+def fake_process_document(latency_seconds: float) -> Callable[[str], Dict[str, Any]]:
+    """Stand-in for W2Extractor.process_document returning one canned W-2"""
+    def process_document(file_path: str) -> Dict[str, Any]:
+        if latency_seconds:
+            time.sleep(latency_seconds)
+        form = {"page": 1, "pages": [1], "text": "", "confidence": 0.9,
+                "extracted_fields": dict(CANNED_FIELDS)}
+        return {"is_w2": True, "confidence": 0.9, "raw_text": "", "extracted_fields": form["extracted_fields"],
+                "forms": [form], "page_count": 1, "error": None, "timings": {}}
+    return process_document
+
+
+def load_app(database_url: str, real_ocr: bool, ocr_latency_ms: float, workdir: Path):
+    """Import main against the given database, with uploads kept in a scratch directory"""
+    os.environ["DATABASE_URL"] = database_url
+    os.chdir(workdir)
+    sys.path.insert(0, str(BACKEND_DIR))
+
+    import main
+    import extraction
+    if not real_ocr:
+        extraction.get_extractor().process_document = fake_process_document(ocr_latency_ms / 1000.0)
+    return main.app
+
+
+class LoadTest:
+    def __init__(self, client, mix: Dict[str, int], seed: int = 1):
+        self.client = client
+        self.mix = mix
+        self.rng = random.Random(seed)
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.users: List[Dict[str, Any]] = []
+        self._user_ids = itertools.count()
+
+    async def _timed(self, name: str, method: str, url: str, expected=(200,), **kwargs):
+        start = time.perf_counter()
+        response = await self.client.request(method, url, **kwargs)
+        self.latencies[name].append((time.perf_counter() - start) * 1000)
+        if response.status_code not in expected:
+            self.errors[name] += 1
+        return response
+
+    async def register(self, user=None):
+        number = next(self._user_ids)
+        user = {"email": f"load{number}_{self.rng.randint(0, 10 ** 9)}@example.com", "password": "load-test-pw"}
+        await self._timed("POST /register", "POST", "/register",
+                          json={"email": user["email"], "full_name": f"Load User {number}", "password": user["password"]})
+        return user
+
+    async def login(self, user):
+        response = await self._timed("POST /token", "POST", "/token",
+                                     data={"username": user["email"], "password": user["password"]})
+        if response.status_code == 200:
+            user["headers"] = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    async def upload(self, user):
+        await self._timed("POST /documents/upload", "POST", "/documents/upload", headers=user["headers"],
+                          files={"file": (f"w2_{self.rng.randint(0, 10 ** 6)}.pdf", FAKE_PDF, "application/pdf")})
+
+    async def _poll(self, user, url: str):
+        """GET a list endpoint the way a polling client does, revalidating with its last ETag"""
+        etags = user.setdefault("etags", {})
+        headers = dict(user["headers"])
+        if url in etags:
+            headers["If-None-Match"] = etags[url]
+        response = await self._timed(f"GET {url}", "GET", url, expected=(200, 304), headers=headers)
+        if "etag" in response.headers:
+            etags[url] = response.headers["etag"]
+
+    async def list_documents(self, user):
+        await self._poll(user, "/documents")
+
+    async def list_w2_forms(self, user):
+        await self._poll(user, "/w2-forms")
+
+    async def list_tax_returns(self, user):
+        await self._poll(user, "/tax-returns")
+
+    async def create_tax_return(self, user):
+        await self._timed("POST /tax-returns", "POST", "/tax-returns", headers=user["headers"],
+                          json={"tax_year": 2023, "income": self.rng.uniform(20000, 200000),
+                                "withholdings": self.rng.uniform(0, 20000)})
+
+    async def me(self, user):
+        await self._timed("GET /me", "GET", "/me", headers=user["headers"])
+
+    async def setup_users(self, count: int, concurrency: int):
+        """Register/login burst creating the virtual users"""
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def create():
+            async with semaphore:
+                user = await self.register()
+                await self.login(user)
+                if "headers" in user:
+                    self.users.append(user)
+
+        await asyncio.gather(*(create() for _ in range(count)))
+        if not self.users:
+            raise RuntimeError("No virtual user could register and log in; is the app healthy?")
+
+    async def run(self, total_requests: int, concurrency: int):
+        operations = list(self.mix)
+        weights = [self.mix[name] for name in operations]
+        remaining = itertools.count()
+
+        async def virtual_user(user):
+            while next(remaining) < total_requests:
+                operation = self.rng.choices(operations, weights)[0]
+                await getattr(self, operation)(user)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(virtual_user(self.users[i % len(self.users)]) for i in range(concurrency)))
+        return time.perf_counter() - start
+
+
+def build_report(test: LoadTest, wall_seconds: float, args) -> Dict[str, Any]:
+    endpoints = {}
+    for name, values in sorted(test.latencies.items()):
+        endpoints[name] = {
+            **summarize(values),
+            "errors": test.errors.get(name, 0),
+            "throughput_rps": round(len(values) / wall_seconds, 2) if wall_seconds else 0.0,
+        }
+    total = sum(len(values) for values in test.latencies.values())
+    return {
+        "environment": environment(),
+        "mix": args.mix,
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "users": args.users,
+        "real_ocr": args.real_ocr,
+        "wall_seconds": round(wall_seconds, 3),
+        "throughput_rps": round(total / wall_seconds, 2) if wall_seconds else 0.0,
+        "endpoints": endpoints,
+    }
+
+
+def combine_reports(reports: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """One report whose per-endpoint statistics are medians across repeated runs"""
+    endpoints = {}
+    for name in sorted({name for report in reports for name in report["endpoints"]}):
+        runs = [report["endpoints"][name] for report in reports if name in report["endpoints"]]
+        endpoints[name] = {key: round(statistics.median(run[key] for run in runs), 3)
+                           for key in runs[0] if key != "errors"}
+        endpoints[name]["errors"] = sum(run["errors"] for run in runs)
+    return {
+        **{key: value for key, value in reports[0].items() if key not in ("endpoints", "wall_seconds")},
+        "runs": len(reports),
+        "wall_seconds": round(sum(report["wall_seconds"] for report in reports), 3),
+        "throughput_rps": round(statistics.median(report["throughput_rps"] for report in reports), 2),
+        "endpoints": endpoints,
+    }
+
+
+def find_regressions(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float,
+                     min_samples: int = 50) -> List[str]:
+    """Endpoints whose p95 grew or throughput fell by more than `threshold`, or that started failing.
+
+    Latency is only compared for endpoints with at least `min_samples`
+    requests per run in both reports.
+    """
+    regressions = []
+    for name, stats in current["endpoints"].items():
+        old = baseline.get("endpoints", {}).get(name)
+        if not old or not old.get("count"):
+            continue
+        if min(stats["count"], old["count"]) >= min_samples and old.get("p95") \
+                and stats["p95"] > old["p95"] * (1 + threshold):
+            regressions.append(f"{name} p95 {old['p95']}ms -> {stats['p95']}ms")
+        if old.get("errors", 0) == 0 and stats["errors"] > 0:
+            regressions.append(f"{name} started failing ({stats['errors']} errors)")
+    if baseline.get("throughput_rps") and current["throughput_rps"] < baseline["throughput_rps"] * (1 - threshold):
+        regressions.append(f"throughput {baseline['throughput_rps']} -> {current['throughput_rps']} req/s")
+    return regressions
+
+
+async def run_load_test(args) -> Dict[str, Any]:
+    import httpx
+
+    workdir = Path(tempfile.mkdtemp(prefix="taxbox-load-"))
+    database_url = args.database_url or f"sqlite:///{workdir / 'load_test.db'}"
+    app = load_app(database_url, args.real_ocr, args.ocr_latency_ms, workdir)
+
+    reports = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://loadtest") as client:
+        for run in range(args.runs):
+            test = LoadTest(client, MIXES[args.mix], seed=args.seed + run)
+            await test.setup_users(args.users, args.concurrency)
+            wall_seconds = await test.run(args.requests, args.concurrency)
+            reports.append(build_report(test, wall_seconds, args))
+    return combine_reports(reports)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="In-process load test for the TaxBox.AI API")
+    parser.add_argument("--mix", choices=sorted(MIXES), default="default")
+    parser.add_argument("--requests", type=int, default=1000, help="steady-state requests after user setup")
+    parser.add_argument("--concurrency", type=int, default=10, help="concurrent virtual users")
+    parser.add_argument("--users", type=int, default=20, help="users registered during setup")
+    parser.add_argument("--database-url", help="defaults to a throwaway SQLite file")
+    parser.add_argument("--real-ocr", action="store_true", help="run the real extractor on uploads")
+    parser.add_argument("--ocr-latency-ms", type=float, default=0.0, help="simulated extraction time when mocked")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--baseline", default=str(DEFAULT_BASELINE))
+    parser.add_argument("--runs", type=int, default=3, help="repeat the test and compare medians across runs")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed fractional regression")
+    parser.add_argument("--min-samples", type=int, default=50,
+                        help="requests per run an endpoint needs before its latency is gated")
+    parser.add_argument("--update-baseline", action="store_true", help="store this run as the new baseline")
+    parser.add_argument("--output", help="result file (default benchmarks/results/load-<ts>.json)")
+    args = parser.parse_args()
+
+    baseline_path = Path(args.baseline).resolve()
+    output_path = Path(args.output).resolve() if args.output else None
+    if not args.update_baseline and not baseline_path.exists():
+        # A gate without a baseline would pass every run
+        print(f"no baseline at {baseline_path}; run with --update-baseline to create one")
+        sys.exit(1)
+
+    report = asyncio.run(run_load_test(args))
+    path = save_results("load", report, output_path)
+
+    print(f"\n{args.mix} mix: {args.runs} x {args.requests} requests, {args.concurrency} concurrent, "
+          f"{report['wall_seconds']}s, {report['throughput_rps']} req/s (medians across runs)")
+    print(f"{'endpoint':<26}{'count':>7}{'p50':>10}{'p95':>10}{'p99':>10}{'rps':>9}{'errors':>8}")
+    for name, stats in report["endpoints"].items():
+        print(f"{name:<26}{stats['count']:>7}{stats['p50']:>10}{stats['p95']:>10}{stats['p99']:>10}"
+              f"{stats['throughput_rps']:>9}{stats['errors']:>8}")
+    print(f"results written to {path}")
+
+    if args.update_baseline:
+        save_results("load", report, baseline_path)
+        print(f"baseline updated: {baseline_path}")
+        return
+
+    regressions = find_regressions(report, load_results(baseline_path), args.threshold, args.min_samples)
+    if regressions:
+        print(f"\nREGRESSION beyond {args.threshold:.0%} of baseline:")
+        for line in regressions:
+            print(f"  {line}")
+        sys.exit(1)
+    print(f"no regression beyond {args.threshold:.0%} of baseline")
+
+
+if __name__ == "__main__":
+    main()
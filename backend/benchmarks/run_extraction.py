@@ -0,0 +1,211 @@
+"""End-to-end extraction benchmark.
+
+Pushes a corpus from ``benchmarks.w2_corpus`` through
+``W2Extractor.process_document`` and reports per-stage latency percentiles,
+throughput per core, peak RSS and field-level accuracy. Results are written
+as JSON; ``--compare`` prints the deltas against an earlier run.
+
+Usage:
+    python -m benchmarks.w2_corpus --out bench_corpus --count 10
+    python -m benchmarks.run_extraction --corpus bench_corpus --workers 2
+    python -m benchmarks.run_extraction --corpus bench_corpus --compare benchmarks/results/extraction-<ts>.json
+"""
+import argparse
+import json
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from benchmarks.stats import environment, load_results, peak_rss_mb, save_results, summarize
+
+NUMERIC_TOLERANCE = 0.005
+
+_extractor = None
+
+
+def _init_worker():
+    global _extractor
+    from services.w2_extractor import W2Extractor
+    _extractor = W2Extractor()
+
+
+def _run_one(path: str) -> Tuple[str, float, Dict[str, Any]]:
+    start = time.perf_counter()
+    result = _extractor.process_document(path)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    # Raw text and token positions are large and irrelevant to scoring
+    result.pop("raw_text", None)
+    result.pop("tokens", None)
+    for form in result.get("forms", []):
+        form.pop("text", None)
+    return path, elapsed_ms, result
+
+
+def _values_match(expected: Any, actual: Any) -> bool:
+    if actual is None:
+        return False
+    if isinstance(expected, float):
+        try:
+            return abs(float(actual) - expected) <= NUMERIC_TOLERANCE
+        except (TypeError, ValueError):
+            return False
+    return str(actual).strip().lower() == str(expected).strip().lower()
+
+
+def score_document(truth: Dict[str, Any], result: Dict[str, Any], field_totals, field_correct) -> Dict[str, Any]:
+    """Compare one extraction result with its ground truth, updating per-field tallies"""
+    predicted = [form.get("extracted_fields", {}) for form in result.get("forms", [])]
+    if not predicted and result.get("extracted_fields"):
+        predicted = [result["extracted_fields"]]
+    by_ssn = {fields.get("employee_ssn"): fields for fields in predicted if fields.get("employee_ssn")}
+
+    for index, expected in enumerate(truth["forms"]):
+        actual = by_ssn.get(expected["employee_ssn"]) or (predicted[index] if index < len(predicted) else {})
+        for field, value in expected.items():
+            field_totals[field] += 1
+            if _values_match(value, actual.get(field)):
+                field_correct[field] += 1
+
+    return {
+        "classified_correctly": bool(result.get("is_w2")) == truth["is_w2"],
+        "forms_expected": len(truth["forms"]),
+        "forms_found": len(predicted),
+        "error": result.get("error"),
+    }
+
+
+def run_benchmark(corpus: Path, workers: int = 1, limit: Optional[int] = None,
+                  kinds: Optional[List[str]] = None) -> Dict[str, Any]:
+    with open(corpus / "manifest.json") as f:
+        manifest = json.load(f)
+
+    documents = manifest["documents"]
+    if kinds:
+        documents = [doc for doc in documents if doc["kind"] in kinds]
+    if limit:
+        documents = documents[:limit]
+    truth_by_path = {str(corpus / doc["file"]): doc for doc in documents}
+
+    start = time.perf_counter()
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+            outputs = list(executor.map(_run_one, truth_by_path))
+    else:
+        _init_worker()
+        outputs = [_run_one(path) for path in truth_by_path]
+    wall_seconds = time.perf_counter() - start
+
+    stage_ms = defaultdict(list)
+    latency_by_kind = defaultdict(list)
+    field_totals = defaultdict(int)
+    field_correct = defaultdict(int)
+    classified = 0
+    forms_expected = forms_found = 0
+    pages = 0
+    errors = []
+
+    for path, elapsed_ms, result in outputs:
+        truth = truth_by_path[path]
+        latency_by_kind[truth["kind"]].append(elapsed_ms)
+        pages += result.get("page_count", 1)
+        for stage, seconds in result.get("timings", {}).items():
+            stage_ms[stage].append(seconds * 1000)
+
+        score = score_document(truth, result, field_totals, field_correct)
+        classified += score["classified_correctly"]
+        forms_expected += score["forms_expected"]
+        forms_found += score["forms_found"]
+        if score["error"]:
+            errors.append({"file": truth["file"], "error": score["error"]})
+
+    total_fields = sum(field_totals.values())
+    docs_per_second = len(documents) / wall_seconds if wall_seconds else 0.0
+
+    return {
+        "environment": environment(),
+        "corpus": str(corpus),
+        "documents": len(documents),
+        "workers": workers,
+        "wall_seconds": round(wall_seconds, 3),
+        "throughput": {
+            "docs_per_second": round(docs_per_second, 3),
+            "docs_per_second_per_core": round(docs_per_second / workers, 3),
+            "pages_per_second": round(pages / wall_seconds, 3) if wall_seconds else 0.0,
+        },
+        "latency_ms": {
+            "all": summarize(ms for values in latency_by_kind.values() for ms in values),
+            "by_kind": {kind: summarize(values) for kind, values in sorted(latency_by_kind.items())},
+        },
+        "stages_ms": {stage: summarize(values) for stage, values in sorted(stage_ms.items())},
+        "peak_rss_mb": max(peak_rss_mb(), peak_rss_mb(children=True)),
+        "accuracy": {
+            "classification": round(classified / len(documents), 4) if documents else 0.0,
+            "fields": round(sum(field_correct.values()) / total_fields, 4) if total_fields else 0.0,
+            "by_field": {
+                field: round(field_correct[field] / total, 4) for field, total in sorted(field_totals.items())
+            },
+            "forms_expected": forms_expected,
+            "forms_found": forms_found,
+        },
+        "errors": errors[:50],
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any]) -> List[str]:
+    """Human-readable deltas for the headline numbers"""
+    def delta(label, new, old, lower_is_better=True):
+        if not old:
+            return f"{label}: {new} (no baseline)"
+        change = (new - old) / old * 100
+        better = change < 0 if lower_is_better else change > 0
+        return f"{label}: {old} -> {new} ({change:+.1f}%, {'better' if better else 'worse'})"
+
+    lines = [
+        delta("latency p50 ms", current["latency_ms"]["all"].get("p50", 0), baseline["latency_ms"]["all"].get("p50", 0)),
+        delta("latency p95 ms", current["latency_ms"]["all"].get("p95", 0), baseline["latency_ms"]["all"].get("p95", 0)),
+        delta("docs/s/core", current["throughput"]["docs_per_second_per_core"],
+              baseline["throughput"]["docs_per_second_per_core"], lower_is_better=False),
+        delta("peak RSS MB", current["peak_rss_mb"], baseline["peak_rss_mb"]),
+        delta("field accuracy", current["accuracy"]["fields"], baseline["accuracy"]["fields"], lower_is_better=False),
+    ]
+    for stage, summary in current["stages_ms"].items():
+        old = baseline.get("stages_ms", {}).get(stage, {})
+        lines.append(delta(f"stage {stage} p50 ms", summary.get("p50", 0), old.get("p50", 0)))
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark W-2 extraction on a synthetic corpus")
+    parser.add_argument("--corpus", default="bench_corpus", help="directory produced by benchmarks.w2_corpus")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes")
+    parser.add_argument("--limit", type=int, help="only run the first N documents")
+    parser.add_argument("--kinds", help="comma-separated subset of document kinds")
+    parser.add_argument("--output", help="result file (default benchmarks/results/extraction-<ts>.json)")
+    parser.add_argument("--compare", help="earlier result file to diff against")
+    args = parser.parse_args()
+
+    kinds = [kind.strip() for kind in args.kinds.split(",")] if args.kinds else None
+    results = run_benchmark(Path(args.corpus), args.workers, args.limit, kinds)
+    path = save_results("extraction", results, args.output)
+
+    print(f"{results['documents']} documents in {results['wall_seconds']}s with {results['workers']} worker(s)")
+    print(f"throughput: {results['throughput']}")
+    print(f"latency ms: {results['latency_ms']['all']}")
+    for stage, summary in results["stages_ms"].items():
+        print(f"  {stage:<15} {summary}")
+    print(f"peak RSS: {results['peak_rss_mb']} MB")
+    print(f"accuracy: classification={results['accuracy']['classification']} fields={results['accuracy']['fields']}")
+    if results["errors"]:
+        print(f"{len(results['errors'])} document(s) reported errors, e.g. {results['errors'][0]}")
+    print(f"results written to {path}")
+
+    if args.compare:
+        print(f"\ncompared with {args.compare}:")
+        for line in compare(results, load_results(args.compare)):
+            print(f"  {line}")
+
+
+if __name__ == "__main__":
+    main()
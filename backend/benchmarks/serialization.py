@@ -0,0 +1,119 @@
+"""Microbenchmark: list endpoint serialization, current path vs. fast path.
+
+- response_model: ORM objects -> TypeAdapter(List[Schema]) with from_attributes
+  -> jsonable_encoder -> json.dumps (what FastAPI + JSONResponse do)
+- fast_validated: column rows -> cached TypeAdapter validate + dump_json
+- fast_trusted: column rows -> orjson, no validation
+
+Usage (from the backend directory):
+    python -m benchmarks.serialization --rows 5000 --repeat 5
+"""
+import argparse
+import json
+import time
+from datetime import datetime
+from typing import List
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+
+import serialization
+from benchmarks.stats import environment, save_results, summarize
+from models import Base, W2Form
+from schemas import W2FormResponse
+
+
+def seed(session, rows: int) -> None:
+    now = datetime.utcnow()
+    session.add_all([
+        W2Form(
+            user_id=1, document_id=i, page_number=1,
+            employer_name=f"EMPLOYER {i}", employer_address="123 MAIN ST, SPRINGFIELD, IL",
+            employer_ein="12-3456789", employee_ssn="123-45-6789", employee_name=f"EMPLOYEE {i}",
+            employee_address="456 OAK AVE, SPRINGFIELD, IL",
+            wages_tips_compensation=50000.0 + i, federal_income_tax_withheld=6000.0,
+            social_security_wages=50000.0 + i, social_security_tax_withheld=3100.0,
+            medicare_wages=50000.0 + i, medicare_tax_withheld=725.0,
+            social_security_tips=0.0, allocated_tips=0.0, dependent_care_benefits=0.0,
+            nonqualified_plans=0.0, state_wages=50000.0 + i, state_income_tax=2500.0,
+            local_wages=0.0, local_income_tax=0.0, tax_year=2023, confidence_score=0.9,
+            raw_extracted_data={"raw_text": "x" * 2000}, created_at=now, updated_at=now,
+        )
+        for i in range(rows)
+    ])
+    session.commit()
+
+
+def response_model_path(session) -> bytes:
+    objects = session.query(W2Form).filter(W2Form.user_id == 1).all()
+    validated = TypeAdapter(List[W2FormResponse]).validate_python(objects, from_attributes=True)
+    encoded = jsonable_encoder(validated)
+    body = json.dumps(encoded, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+    session.expunge_all()
+    return body
+
+
+def _rows(session):
+    columns = serialization.schema_columns(W2Form, W2FormResponse)
+    statement = select(*[getattr(W2Form, name) for name in columns]).where(W2Form.user_id == 1).order_by(W2Form.id)
+    return columns, session.execute(statement).all()
+
+
+def fast_validated_path(session) -> bytes:
+    columns, rows = _rows(session)
+    return serialization.rows_to_json(columns, rows, W2FormResponse)
+
+
+def fast_trusted_path(session) -> bytes:
+    columns, rows = _rows(session)
+    return serialization.rows_to_json(columns, rows)
+
+
+PATHS = {
+    "response_model": response_model_path,
+    "fast_validated": fast_validated_path,
+    "fast_trusted": fast_trusted_path,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare list serialization paths")
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="result file (default benchmarks/results/serialization-<ts>.json)")
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    with Session() as session:
+        seed(session, args.rows)
+
+    results = {"environment": environment(), "rows": args.rows, "orjson": serialization.orjson is not None, "paths": {}}
+    reference = None
+    for name, func in PATHS.items():
+        timings = []
+        for _ in range(args.repeat + 1):
+            with Session() as session:
+                start = time.perf_counter()
+                body = func(session)
+                timings.append((time.perf_counter() - start) * 1000)
+        timings = timings[1:]  # drop warm-up
+
+        decoded = json.loads(body)
+        if reference is None:
+            reference = decoded
+        results["paths"][name] = {**summarize(timings), "bytes": len(body), "matches_response_model": decoded == reference}
+
+    baseline = results["paths"]["response_model"]["p50"]
+    print(f"{args.rows} W2FormResponse rows, orjson={'yes' if results['orjson'] else 'no'}")
+    for name, stats in results["paths"].items():
+        speedup = baseline / stats["p50"] if stats["p50"] else 0
+        print(f"  {name:<16} p50 {stats['p50']:>9.2f} ms  x{speedup:.1f}  same output: {stats['matches_response_model']}")
+    print(f"results written to {save_results('serialization', results, args.output)}")
+
+
+if __name__ == "__main__":
+    main()
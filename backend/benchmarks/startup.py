@@ -0,0 +1,88 @@
+"""API cold-start benchmark: import time and resident memory of ``import main``.
+
+Each sample imports the app in a fresh interpreter (throwaway SQLite, scratch
+working directory) and reports wall time and peak RSS. The run fails when the
+OCR stack was imported by the API process or a limit is exceeded, so it can
+gate changes that make API workers heavier.
+
+Usage (from the backend directory):
+    python -m benchmarks.startup --samples 5 --max-import-seconds 3 --max-rss-mb 150
+"""
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from benchmarks.stats import environment, save_results, summarize
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# Modules only the extraction worker should load
+OCR_MODULES = ["cv2", "numpy", "pytesseract", "pdfplumber", "pdf2image", "PIL"]
+
+PROBE = """
+import json, os, resource, sys, time
+sys.path.insert(0, {backend!r})
+os.chdir({workdir!r})
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join({workdir!r}, "startup.db")
+baseline_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+start = time.perf_counter()
+import main
+elapsed = time.perf_counter() - start
+print("__STARTUP__" + json.dumps({{
+    "import_seconds": elapsed,
+    "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "interpreter_rss_mb": baseline_kb / 1024,
+    "ocr_modules_loaded": [name for name in {ocr_modules!r} if name in sys.modules],
+}}))
+"""
+
+
+def sample_startup() -> dict:
+    workdir = tempfile.mkdtemp(prefix="taxbox-startup-")
+    code = PROBE.format(backend=str(BACKEND_DIR), workdir=workdir, ocr_modules=OCR_MODULES)
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    line = next(line for line in output.splitlines() if line.startswith("__STARTUP__"))
+    return json.loads(line[len("__STARTUP__"):])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure API import time and RSS")
+    parser.add_argument("--samples", type=int, default=5)
+    parser.add_argument("--max-import-seconds", type=float, help="fail if median import time exceeds this")
+    parser.add_argument("--max-rss-mb", type=float, help="fail if median peak RSS exceeds this")
+    parser.add_argument("--output", help="result file (default benchmarks/results/startup-<ts>.json)")
+    args = parser.parse_args()
+
+    samples = [sample_startup() for _ in range(args.samples)]
+    report = {
+        "environment": environment(),
+        "import_ms": summarize(sample["import_seconds"] * 1000 for sample in samples),
+        "peak_rss_mb": summarize(sample["peak_rss_mb"] for sample in samples),
+        "ocr_modules_loaded": sorted({name for sample in samples for name in sample["ocr_modules_loaded"]}),
+    }
+    path = save_results("startup", report, args.output)
+
+    print(f"import main: {report['import_ms']}")
+    print(f"peak RSS MB: {report['peak_rss_mb']}")
+    print(f"results written to {path}")
+
+    failures = []
+    if report["ocr_modules_loaded"]:
+        failures.append(f"API process imported OCR modules: {', '.join(report['ocr_modules_loaded'])}")
+    if args.max_import_seconds and report["import_ms"]["p50"] > args.max_import_seconds * 1000:
+        failures.append(f"median import {report['import_ms']['p50']}ms > {args.max_import_seconds}s")
+    if args.max_rss_mb and report["peak_rss_mb"]["p50"] > args.max_rss_mb:
+        failures.append(f"median peak RSS {report['peak_rss_mb']['p50']}MB > {args.max_rss_mb}MB")
+
+    if failures:
+        for failure in failures:
+            print(f"FAIL: {failure}")
+        sys.exit(1)
+    print("OK: API starts without the OCR stack")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+"""Synthetic W-2 corpus with known ground truth.
+
+Renders the same W-2 content as:
+- text-layer PDFs (hand-written PDF with real text operators)
+- scanned-style PDFs (rasterized page embedded as an image)
+- noisy, rotated, high-resolution photos (JPEG)
+- multi-employee payroll packets (one copy per page, with duplicate copies)
+- non-W-2 documents (1099-NEC) as classification negatives
+
+Usage: python -m benchmarks.w2_corpus --out bench_corpus --count 20 --seed 7
+"""
+import argparse
+import json
+import random
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+import cv2
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+EMPLOYERS = ["ACME PAYROLL SERVICES INC", "NORTHWIND TRADERS LLC", "CONTOSO HEALTH SYSTEMS",
+             "GLOBEX MANUFACTURING CO", "INITECH SOFTWARE CORP", "UMBRELLA LOGISTICS INC"]
+FIRST_NAMES = ["JAMES", "MARIA", "ROBERT", "LINDA", "DAVID", "SUSAN", "CARLOS", "PRIYA"]
+LAST_NAMES = ["SMITH", "GARCIA", "JOHNSON", "NGUYEN", "PATEL", "BROWN", "KIM", "LOPEZ"]
+
+PAGE_WIDTH, PAGE_HEIGHT = 612, 792  # US letter, PDF points
+FONT_CANDIDATES = ["DejaVuSans.ttf", "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", "Arial.ttf"]
+
+
+def random_w2(rng: random.Random) -> Dict[str, Any]:
+    """Ground-truth field values for one W-2"""
+    wages = round(rng.uniform(18000, 240000), 2)
+    ss_wages = min(wages, 160200.0)
+    return {
+        "employer_name": rng.choice(EMPLOYERS),
+        "employer_ein": f"{rng.randint(10, 99)}-{rng.randint(1000000, 9999999)}",
+        "employee_ssn": f"{rng.randint(100, 899)}-{rng.randint(10, 99)}-{rng.randint(1000, 9999)}",
+        "employee_name": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+        "wages_tips_compensation": wages,
+        "federal_income_tax_withheld": round(wages * rng.uniform(0.08, 0.24), 2),
+        "social_security_wages": ss_wages,
+        "social_security_tax_withheld": round(ss_wages * 0.062, 2),
+        "medicare_wages": wages,
+        "medicare_tax_withheld": round(wages * 0.0145, 2),
+        "tax_year": rng.choice([2021, 2022, 2023]),
+    }
+
+
+def w2_lines(fields: Dict[str, Any], copy_label: str = "Copy B") -> List[str]:
+    """Text lines of one W-2 copy, laid out like the IRS form labels"""
+    return [
+        f"a Employee's social security number {fields['employee_ssn']}",
+        f"b Employer identification number (EIN) {fields['employer_ein']}",
+        "c Employer's name, address, and ZIP code",
+        fields["employer_name"],
+        "123 MAIN STREET, SPRINGFIELD, IL 62701",
+        f"e Employee's first name and initial Last name {fields['employee_name']}",
+        f"1 Wages, tips, other compensation {fields['wages_tips_compensation']:.2f}",
+        f"2 Federal income tax withheld {fields['federal_income_tax_withheld']:.2f}",
+        f"3 Social security wages {fields['social_security_wages']:.2f}",
+        f"4 Social security tax withheld {fields['social_security_tax_withheld']:.2f}",
+        f"5 Medicare wages and tips {fields['medicare_wages']:.2f}",
+        f"6 Medicare tax withheld {fields['medicare_tax_withheld']:.2f}",
+        f"Form W-2 Wage and Tax Statement {fields['tax_year']}",
+        f"{copy_label} - To Be Filed With Employee's FEDERAL Tax Return",
+    ]
+
+
+def form_1099_lines(rng: random.Random) -> List[str]:
+    """A non-W-2 negative sample"""
+    return [
+        "Form 1099-NEC Nonemployee Compensation",
+        f"PAYER'S TIN {rng.randint(10, 99)}-{rng.randint(1000000, 9999999)}",
+        f"RECIPIENT'S TIN {rng.randint(100, 899)}-{rng.randint(10, 99)}-{rng.randint(1000, 9999)}",
+        f"1 Nonemployee compensation {rng.uniform(1000, 90000):.2f}",
+        f"4 Federal income tax withheld {rng.uniform(0, 5000):.2f}",
+        "Copy B For Recipient Department of the Treasury - Internal Revenue Service",
+    ]
+
+
+def _pdf_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_text_pdf(path: Path, pages: List[List[str]], font_size: int = 10) -> None:
+    """Write a PDF whose pages carry a real text layer (Helvetica, one Tj per line)"""
+    objects: List[bytes] = []
+
+    def add(body: bytes) -> int:
+        objects.append(body)
+        return len(objects)
+
+    catalog_id = add(b"")  # filled in once the page tree id is known
+    pages_id = add(b"")
+    font_id = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+
+    page_ids = []
+    for lines in pages:
+        ops = [f"BT /F1 {font_size} Tf {font_size + 4} TL 50 {PAGE_HEIGHT - 60} Td"]
+        for line in lines:
+            ops.append(f"({_pdf_escape(line)}) Tj T*")
+        ops.append("ET")
+        stream = "\n".join(ops).encode("latin-1", "replace")
+        content_id = add(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        page_ids.append(add(
+            f"<< /Type /Page /Parent {pages_id} 0 R /MediaBox [0 0 {PAGE_WIDTH} {PAGE_HEIGHT}] "
+            f"/Resources << /Font << /F1 {font_id} 0 R >> >> /Contents {content_id} 0 R >>".encode()
+        ))
+
+    kids = " ".join(f"{page_id} 0 R" for page_id in page_ids)
+    objects[pages_id - 1] = f"<< /Type /Pages /Kids [{kids}] /Count {len(page_ids)} >>".encode()
+    objects[catalog_id - 1] = f"<< /Type /Catalog /Pages {pages_id} 0 R >>".encode()
+
+    output = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(output))
+        output += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref_offset = len(output)
+    output += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        output += b"%010d 00000 n \n" % offset
+    output += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1, catalog_id, xref_offset)
+    path.write_bytes(bytes(output))
+
+
+def _font(size: int):
+    for candidate in FONT_CANDIDATES:
+        try:
+            return ImageFont.truetype(candidate, size)
+        except OSError:
+            continue
+    return ImageFont.load_default()
+
+
+def render_page(lines: List[str], dpi: int = 200) -> Image.Image:
+    """Rasterize text lines onto a white letter-size page"""
+    scale = dpi / 72.0
+    image = Image.new("L", (int(PAGE_WIDTH * scale), int(PAGE_HEIGHT * scale)), 255)
+    draw = ImageDraw.Draw(image)
+    font = _font(int(11 * scale))
+    y = int(60 * scale)
+    for line in lines:
+        draw.text((int(50 * scale), y), line, fill=0, font=font)
+        y += int(16 * scale)
+    return image
+
+
+def write_scanned_pdf(path: Path, pages: List[List[str]], dpi: int = 200) -> None:
+    """A PDF with no text layer: each page is a rasterized image"""
+    images = [render_page(lines, dpi).convert("RGB") for lines in pages]
+    images[0].save(path, "PDF", resolution=dpi, save_all=True, append_images=images[1:])
+
+
+def write_photo(path: Path, lines: List[str], rng: random.Random, dpi: int = 300) -> None:
+    """A phone-photo style JPEG: rotated, blurred, noisy and unevenly lit"""
+    page = np.array(render_page(lines, dpi), dtype=np.float32)
+
+    # Uneven lighting
+    height, width = page.shape
+    gradient = np.linspace(rng.uniform(0.75, 0.9), 1.0, width, dtype=np.float32)
+    page = page * gradient[np.newaxis, :]
+
+    # Small rotation on a grey "table" background
+    angle = rng.uniform(-4.0, 4.0)
+    matrix = cv2.getRotationMatrix2D((width / 2, height / 2), angle, 1.0)
+    page = cv2.warpAffine(page, matrix, (width, height), borderValue=rng.uniform(90, 140))
+
+    # Lens blur and sensor noise
+    page = cv2.GaussianBlur(page, (3, 3), 0)
+    np_rng = np.random.default_rng(rng.randint(0, 2 ** 31))
+    page = page + np_rng.normal(0, rng.uniform(4, 12), page.shape).astype(np.float32)
+
+    image = np.clip(page, 0, 255).astype(np.uint8)
+    cv2.imwrite(str(path), cv2.cvtColor(image, cv2.COLOR_GRAY2BGR), [cv2.IMWRITE_JPEG_QUALITY, 85])
+
+
+def generate_corpus(out_dir: Path, count: int, seed: int = 7, packet_size: int = 6,
+                    kinds: Tuple[str, ...] = ("text_pdf", "scanned_pdf", "photo", "packet", "non_w2")) -> Dict[str, Any]:
+    """Write `count` documents of each kind plus manifest.json with ground truth"""
+    rng = random.Random(seed)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    documents = []
+
+    for index in range(count):
+        for kind in kinds:
+            if kind == "packet":
+                forms = [random_w2(rng) for _ in range(packet_size)]
+                # Copies B and C of every employee, one copy per page
+                pages = [w2_lines(fields, label) for fields in forms for label in ("Copy B", "Copy C")]
+                filename = f"{kind}_{index:04d}.pdf"
+                write_text_pdf(out_dir / filename, pages)
+                documents.append({"file": filename, "kind": kind, "is_w2": True, "forms": forms})
+                continue
+
+            if kind == "non_w2":
+                filename = f"{kind}_{index:04d}.pdf"
+                write_text_pdf(out_dir / filename, [form_1099_lines(rng)])
+                documents.append({"file": filename, "kind": kind, "is_w2": False, "forms": []})
+                continue
+
+            fields = random_w2(rng)
+            lines = w2_lines(fields)
+            if kind == "text_pdf":
+                filename = f"{kind}_{index:04d}.pdf"
+                write_text_pdf(out_dir / filename, [lines])
+            elif kind == "scanned_pdf":
+                filename = f"{kind}_{index:04d}.pdf"
+                write_scanned_pdf(out_dir / filename, [lines])
+            elif kind == "photo":
+                filename = f"{kind}_{index:04d}.jpg"
+                write_photo(out_dir / filename, lines, rng)
+            else:
+                raise ValueError(f"Unknown document kind: {kind}")
+            documents.append({"file": filename, "kind": kind, "is_w2": True, "forms": [fields]})
+
+    manifest = {"seed": seed, "count": count, "documents": documents}
+    with open(out_dir / "manifest.json", "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic W-2 corpus with ground truth")
+    parser.add_argument("--out", default="bench_corpus", help="output directory")
+    parser.add_argument("--count", type=int, default=10, help="documents per kind")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--packet-size", type=int, default=6, help="employees per payroll packet")
+    parser.add_argument("--kinds", default="text_pdf,scanned_pdf,photo,packet,non_w2")
+    args = parser.parse_args()
+
+    manifest = generate_corpus(Path(args.out), args.count, args.seed, args.packet_size,
+                               tuple(kind.strip() for kind in args.kinds.split(",") if kind.strip()))
+    print(f"Wrote {len(manifest['documents'])} documents to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+"""W-2 extraction jobs shared by the API process and the extraction worker.
+
+The OCR stack (OpenCV, numpy, Tesseract, pdfplumber, pdf2image) is only
+imported when the first document is actually processed, so API workers that
+never extract do not pay its import time or memory.
+"""
+import logging
+import os
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+import metrics
+import versioning
+from database import SessionLocal
+from models import Document, W2Form
+from scheduler import ExtractionJob, ExtractionScheduler, estimate_cost
+
+logger = logging.getLogger(__name__)
+
+# "inline": the API runs extraction on the scheduler's worker threads.
+# "worker": the API only records pending documents and worker.py processes them.
+EXTRACTION_MODE = os.getenv("EXTRACTION_MODE", "inline")
+# A "processing" document claimed longer ago than this is assumed to belong to a
+# dead worker and is claimed again
+EXTRACTION_LEASE_SECONDS = int(os.getenv("EXTRACTION_LEASE_SECONDS", "1800"))
+# A document whose extraction started this many times without finishing is
+# marked failed instead of being claimed again
+EXTRACTION_MAX_ATTEMPTS = int(os.getenv("EXTRACTION_MAX_ATTEMPTS", "3"))
+
+_extractor = None
+
+
+def get_extractor():
+    """Return the shared W2Extractor, importing the OCR stack on first use"""
+    global _extractor
+    if _extractor is None:
+        from services.w2_extractor import W2Extractor
+        _extractor = W2Extractor()
+    return _extractor
+
+
+def _owned(db: Session, document_id: int, claimed_at: datetime):
+    """The document row, if it is still claimed by the extraction started at `claimed_at`"""
+    return db.query(Document).filter(Document.id == document_id, Document.claimed_at == claimed_at)
+
+
+def extract_document(document_id: int, file_path: str, db: Session) -> str:
+    """Run extraction for one document and persist the results; returns the final status.
+
+    Results are only written while the document is still claimed by this run.
+    If it was reclaimed meanwhile (the lease expired), the new owner's results
+    win and these are discarded, so a document never gets two sets of forms.
+    """
+    metrics.EXTRACTION_WORKERS_BUSY.inc()
+    started = time.perf_counter()
+    outcome = "failed"
+    claimed_at = datetime.utcnow()
+    try:
+        # Update document status
+        document = db.query(Document).filter(Document.id == document_id).first()
+        if document:
+            document.extraction_status = "processing"
+            document.claimed_at = claimed_at
+            document.extraction_attempts = (document.extraction_attempts or 0) + 1
+            versioning.bump_version(db, document.user_id, versioning.DOCUMENTS)
+            db.commit()
+
+        # Process the document
+        result = get_extractor().process_document(file_path)
+
+        with metrics.timed_stage("persist"):
+            if result['is_w2'] and not result.get('error'):
+                # Create one W2 form record per distinct form in the document
+                w2_forms = [
+                    W2Form(
+                        user_id=document.user_id,
+                        document_id=document_id,
+                        page_number=form['page'],
+                        raw_extracted_data={
+                            'is_w2': True,
+                            'confidence': form['confidence'],
+                            'raw_text': form['text'],
+                            'pages': form['pages'],
+                            'extracted_fields': form['extracted_fields'],
+                        },
+                        confidence_score=form['confidence'],
+                        **form['extracted_fields']
+                    )
+                    for form in result['forms']
+                ]
+                db.add_all(w2_forms)
+                values = {Document.extraction_status: "completed", Document.processed: True}
+            else:
+                values = {Document.extraction_status: "no_w2_detected" if not result['is_w2'] else "failed"}
+
+            # Conditional on the claim, so a reclaimed document is not written twice
+            if _owned(db, document_id, claimed_at).update(values, synchronize_session=False):
+                outcome = values[Document.extraction_status]
+                versioning.bump_version(db, document.user_id, versioning.DOCUMENTS, versioning.W2_FORMS)
+                db.commit()
+            else:
+                db.rollback()
+                logger.warning(f"Document {document_id} was reclaimed during extraction; discarding results")
+                outcome = "discarded"
+
+    except Exception as e:
+        # Update document status to failed
+        logger.error(f"Extraction failed for document {document_id}: {e}")
+        try:
+            db.rollback()
+            document = _owned(db, document_id, claimed_at).first()
+            if document:
+                document.extraction_status = "failed"
+                versioning.bump_version(db, document.user_id, versioning.DOCUMENTS)
+                db.commit()
+        except Exception as status_error:
+            # Database unavailable: the document stays "processing" until it is reclaimed
+            logger.error(f"Could not mark document {document_id} as failed: {status_error}")
+    finally:
+        metrics.EXTRACTION_WORKERS_BUSY.dec()
+        metrics.EXTRACTION_BUSY_SECONDS.inc(amount=time.perf_counter() - started)
+        metrics.EXTRACTION_DOCUMENTS_TOTAL.inc(outcome)
+
+    return outcome
+
+
+def _run_scheduled_job(job: ExtractionJob) -> None:
+    with SessionLocal() as db:
+        extract_document(job.document_id, job.file_path, db)
+
+
+scheduler = ExtractionScheduler(_run_scheduled_job)
+
+
+def check_admission(user_id: int, count: int = 1) -> None:
+    """Raise QueueFull before accepting uploads the extraction queue has no room for"""
+    if EXTRACTION_MODE != "worker":
+        scheduler.check_admission(user_id, count)
+
+
+def enqueue_extraction(user_id: int, documents: List[Tuple[int, str, str]]) -> Dict[str, Optional[float]]:
+    """Queue (document_id, file_path, file_type) jobs in this process, unless a worker owns extraction.
+
+    Returns the queue position and estimated wait of the last of the jobs to run.
+    """
+    if EXTRACTION_MODE == "worker" or not documents:
+        return {"queue_position": None, "estimated_wait_seconds": None}
+
+    jobs = []
+    for document_id, file_path, file_type in documents:
+        cost, pages = estimate_cost(file_path, file_type)
+        jobs.append(ExtractionJob(document_id, file_path, user_id, cost, pages))
+    return scheduler.submit(jobs)
+
+
+def claim_pending_documents(db: Session, limit: int) -> List[Tuple[int, str]]:
+    """Atomically mark up to `limit` pending documents as processing for this worker.
+
+    Documents left "processing" past EXTRACTION_LEASE_SECONDS (their worker
+    died mid-job) are claimed again along with the pending ones, unless they
+    have used up EXTRACTION_MAX_ATTEMPTS; those are marked failed instead.
+    """
+    lease_expired = datetime.utcnow() - timedelta(seconds=EXTRACTION_LEASE_SECONDS)
+    query = db.query(Document).filter(or_(
+        Document.extraction_status == "pending",
+        (Document.extraction_status == "processing")
+        & or_(Document.claimed_at.is_(None), Document.claimed_at < lease_expired),
+    )).order_by(Document.id).limit(limit)
+    if db.bind.dialect.name == "postgresql":
+        # Concurrent workers skip rows another worker has already locked
+        query = query.with_for_update(skip_locked=True)
+
+    documents = query.all()
+    now = datetime.utcnow()
+    jobs = []
+    for document in documents:
+        if document.extraction_status == "processing":
+            if (document.extraction_attempts or 0) >= EXTRACTION_MAX_ATTEMPTS:
+                logger.error(f"Document {document.id} failed {document.extraction_attempts} extraction attempts")
+                document.extraction_status = "failed"
+                metrics.EXTRACTION_DOCUMENTS_TOTAL.inc("failed")
+                continue
+            logger.warning(f"Reclaiming document {document.id}, claimed at {document.claimed_at}")
+        document.extraction_status = "processing"
+        document.claimed_at = now
+        jobs.append((document.id, document.file_path))
+    for user_id in {document.user_id for document in documents}:
+        versioning.bump_version(db, user_id, versioning.DOCUMENTS)
+    db.commit()
+    return jobs
+
+
+def requeue_unfinished() -> int:
+    """Inline mode start-up: queue documents an earlier process left unfinished.
+
+    The in-process queue does not survive a restart, so pending documents and
+    "processing" ones whose lease ran out are claimed and queued again.
+    Returns the number of documents queued.
+    """
+    if EXTRACTION_MODE == "worker":
+        return 0
+
+    with SessionLocal() as db:
+        claimed = claim_pending_documents(db, scheduler.max_queue)
+        if not claimed:
+            return 0
+        rows = db.query(Document.id, Document.user_id, Document.file_path, Document.file_type).filter(
+            Document.id.in_([document_id for document_id, _ in claimed])
+        ).order_by(Document.id).all()
+
+    by_user = defaultdict(list)
+    for document_id, user_id, file_path, file_type in rows:
+        by_user[user_id].append((document_id, file_path, file_type))
+    for user_id, documents in by_user.items():
+        enqueue_extraction(user_id, documents)
+    return len(rows)
+
+
+def preload() -> float:
+    """Import the OCR stack eagerly (worker start-up); returns seconds spent"""
+    started = time.perf_counter()
+    get_extractor()
+    return time.perf_counter() - started
@@ -0,0 +1,181 @@
+"""Database health checks that cost the same however much data there is.
+
+- ``probe_database``: a pooled ``SELECT 1`` bounded by a timeout, for
+  liveness/readiness checks from the load balancer.
+- ``TABLE_STATS``: per-table row estimates from the catalog (``pg_class`` /
+  ``pg_stat_user_tables`` on Postgres, never ``COUNT(*)``), refreshed by a
+  background thread every ``TABLE_STATS_INTERVAL_SECONDS`` and served from
+  memory. SQLite has no row estimates, so there the refresher counts rows.
+"""
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import bindparam, inspect, text
+
+import metrics
+from database import engine
+from models import Base
+
+logger = logging.getLogger(__name__)
+
+HEALTH_PROBE_TIMEOUT_MS = int(os.getenv("HEALTH_PROBE_TIMEOUT_MS", "2000"))
+TABLE_STATS_INTERVAL_SECONDS = float(os.getenv("TABLE_STATS_INTERVAL_SECONDS", "60"))
+
+TABLE_NAMES = sorted(Base.metadata.tables)
+
+_PG_ESTIMATES = text("""
+    SELECT c.relname,
+           CASE WHEN c.reltuples >= 0 THEN c.reltuples::bigint ELSE s.n_live_tup END AS estimate
+    FROM pg_class c
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    LEFT JOIN pg_stat_user_tables s ON s.relid = c.oid
+    WHERE c.relkind IN ('r', 'p')
+      AND n.nspname = ANY(current_schemas(false))
+      AND c.relname IN :names
+""").bindparams(bindparam("names", expanding=True))
+
+# Probes run here so a hung connection cannot tie up request threads for long
+_probe_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="db-health")
+# At most one probe is in flight; concurrent checks share it instead of queueing more
+_probe_lock = threading.Lock()
+_probe_in_flight: Optional[Tuple[Future, float]] = None
+
+
+def _set_statement_timeout(conn, timeout_ms: int) -> None:
+    if conn.dialect.name == "postgresql":
+        conn.execute(text(f"SET LOCAL statement_timeout = {int(timeout_ms)}"))
+
+
+def _select_one(timeout_ms: int) -> None:
+    with engine.connect() as conn, conn.begin():
+        _set_statement_timeout(conn, timeout_ms)
+        conn.execute(text("SELECT 1"))
+
+
+def _current_probe(timeout_ms: int) -> Tuple[Future, float]:
+    """The running probe and its start time, starting one if none is running"""
+    global _probe_in_flight
+    with _probe_lock:
+        if _probe_in_flight is None or _probe_in_flight[0].done():
+            _probe_in_flight = (_probe_executor.submit(_select_one, timeout_ms), time.perf_counter())
+        return _probe_in_flight
+
+
+def probe_database(timeout_ms: int = HEALTH_PROBE_TIMEOUT_MS) -> Dict[str, Any]:
+    """Readiness check: a pooled ``SELECT 1`` that gives up after `timeout_ms`.
+
+    While the database hangs, no further probes are queued: callers wait on
+    the probe already running, or report unhealthy at once when it has been
+    running for longer than `timeout_ms`.
+    """
+    started = time.perf_counter()
+    try:
+        future, probe_started = _current_probe(timeout_ms)
+        remaining = timeout_ms / 1000.0 - (started - probe_started)
+        if remaining <= 0:
+            raise FutureTimeoutError()
+        future.result(timeout=remaining)
+        status, error = "healthy", None
+    except FutureTimeoutError:
+        status, error = "unhealthy", f"database did not answer within {timeout_ms}ms"
+    except Exception as e:
+        status, error = "unhealthy", str(e)
+    elapsed = time.perf_counter() - started
+    metrics.DB_HEALTH_PROBE_SECONDS.observe(elapsed)
+
+    result = {"status": status, "latency_ms": round(elapsed * 1000, 2)}
+    if error:
+        result["error"] = error
+    return result
+
+
+def read_table_stats(timeout_ms: int = HEALTH_PROBE_TIMEOUT_MS) -> Dict[str, Dict[str, Any]]:
+    """Row estimates per table; Postgres reads the catalog, other databases count"""
+    with engine.connect() as conn, conn.begin():
+        if conn.dialect.name == "postgresql":
+            _set_statement_timeout(conn, timeout_ms)
+            estimates = dict(conn.execute(_PG_ESTIMATES, {"names": TABLE_NAMES}).all())
+            return {
+                name: {"exists": True, "count": estimates[name], "estimated": True}
+                if name in estimates else {"exists": False}
+                for name in TABLE_NAMES
+            }
+
+        existing = set(inspect(conn).get_table_names())
+        stats = {}
+        for name in TABLE_NAMES:
+            if name in existing:
+                count = conn.execute(text(f'SELECT COUNT(*) FROM "{name}"')).scalar()
+                stats[name] = {"exists": True, "count": count, "estimated": False}
+            else:
+                stats[name] = {"exists": False}
+        return stats
+
+
+class TableStatsCache:
+    """Table statistics refreshed in the background and served from memory"""
+
+    def __init__(self, interval: float = TABLE_STATS_INTERVAL_SECONDS):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._tables: Dict[str, Dict[str, Any]] = {}
+        self._refreshed_at: Optional[datetime] = None
+        self._refreshed_monotonic: Optional[float] = None
+        self._error: Optional[str] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def refresh(self) -> None:
+        try:
+            tables = read_table_stats()
+        except Exception as e:
+            logger.warning(f"Table statistics refresh failed: {e}")
+            with self._lock:
+                self._error = str(e)
+            return
+
+        for name, stats in tables.items():
+            if stats.get("count") is not None:
+                metrics.DB_TABLE_ROWS.set(stats["count"], name)
+        with self._lock:
+            self._tables = tables
+            self._refreshed_at = datetime.utcnow()
+            self._refreshed_monotonic = time.monotonic()
+            self._error = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            age = time.monotonic() - self._refreshed_monotonic if self._refreshed_monotonic else None
+            snapshot = {
+                "tables": dict(self._tables),
+                "refreshed_at": self._refreshed_at,
+                "age_seconds": round(age, 1) if age is not None else None,
+            }
+            if self._error:
+                snapshot["refresh_error"] = self._error
+            return snapshot
+
+    def start(self) -> None:
+        """Refresh now and then every `interval` seconds on a daemon thread"""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="table-stats", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.refresh()
+            self._stop.wait(self.interval)
+
+
+TABLE_STATS = TableStatsCache()
@@ -1,9 +1,11 @@
-from fastapi import FastAPI, Depends, HTTPException, status, UploadFile, File, BackgroundTasks
+from fastapi import FastAPI, Depends, HTTPException, status, UploadFile, File, Query, Header, Request
+from fastapi.responses import StreamingResponse, Response, JSONResponse
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from sqlalchemy.orm import Session
-from sqlalchemy import text
+from sqlalchemy import text, func
 from datetime import datetime, timedelta
 from typing import Optional, List
 import jwt
@@ -11,17 +13,28 @@ from passlib.context import CryptContext
 import uvicorn
 import os
 import shutil
+import uuid
+import secrets
+import zipfile
 import aiofiles
 from pathlib import Path
 
 from database import SessionLocal, engine, Base
-from models import User, Document, TaxReturn, Payment, W2Form  # Import models FIRST
+from models import User, Document, TaxReturn, Payment, W2Form, UploadBatch, CollectionVersion  # Import models FIRST
 from schemas import (
-    UserCreate, UserResponse, DocumentResponse, TaxReturnCreate, 
+    UserCreate, UserResponse, DocumentResponse, DocumentUploadResponse, TaxReturnCreate, 
     TaxReturnResponse, PaymentCreate, PaymentResponse, W2FormResponse,
-    W2ExtractionResult
+    W2ExtractionResult, BatchProgressResponse, BatchUploadResponse
 )
-from services.w2_extractor import W2Extractor
+from services.exporter import EXPORT_FORMATS, export_stream
+import metrics
+import extraction
+import versioning
+import serialization
+from scheduler import QueueFull
+import profiling
+import health
+import migrations
 
 # DEFINITIVE database initialization
 print("Initializing database...")
@@ -54,7 +67,7 @@ def init_database():
         print("Verifying table creation...")
         
         # Test each table individually with fresh sessions
-        table_names = ['users', 'documents', 'tax_returns', 'payments', 'w2_forms']
+        table_names = ['users', 'upload_batches', 'documents', 'tax_returns', 'payments', 'w2_forms', 'collection_versions']
         
         for table_name in table_names:
             try:
@@ -69,6 +82,8 @@ def init_database():
                     print(f"Attempting to create {table_name} table individually...")
                     if table_name == 'users':
                         User.__table__.create(engine, checkfirst=True)
+                    elif table_name == 'upload_batches':
+                        UploadBatch.__table__.create(engine, checkfirst=True)
                     elif table_name == 'documents':
                         Document.__table__.create(engine, checkfirst=True)
                     elif table_name == 'tax_returns':
@@ -77,10 +92,19 @@ def init_database():
                         Payment.__table__.create(engine, checkfirst=True)
                     elif table_name == 'w2_forms':
                         W2Form.__table__.create(engine, checkfirst=True)
+                    elif table_name == 'collection_versions':
+                        CollectionVersion.__table__.create(engine, checkfirst=True)
                     print(f"✅ {table_name} table created individually")
                 except Exception as create_error:
                     print(f"❌ Failed to create {table_name}: {create_error}")
         
+        # Tables are never recreated, so bring older ones up to the current models
+        try:
+            for column in migrations.add_missing_columns(engine, User.metadata):
+                print(f"✅ Added column {column}")
+        except Exception as e:
+            print(f"❌ Column upgrade failed: {e}")
+        
         # Final verification
         print("Final verification...")
         with engine.connect() as conn:
@@ -120,6 +144,23 @@ async def startup_event():
     except Exception as e:
         print(f"❌ Startup verification error: {e}")
 
+    # The inline extraction queue lives in memory; pick up what a previous run left behind
+    try:
+        requeued = await run_in_threadpool(extraction.requeue_unfinished)
+        if requeued:
+            print(f"🔁 Re-queued {requeued} unfinished documents for extraction")
+    except Exception as e:
+        print(f"❌ Could not re-queue unfinished documents: {e}")
+
+    # Table statistics for /health/db are refreshed in the background
+    health.TABLE_STATS.start()
+
+@app.on_event("shutdown")
+def shutdown_event():
+    """Stop the in-process extraction threads and the table statistics refresher"""
+    extraction.scheduler.shutdown()
+    health.TABLE_STATS.stop()
+
 @app.get("/")
 def root():
     return {
@@ -144,10 +185,25 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Metrics: request latency per route and per-statement DB timings
+app.add_middleware(metrics.MetricsMiddleware)
+metrics.instrument_engine(engine)
+
+# Opt-in request profiling (X-Profile header or PROFILE_SAMPLE_RATE)
+app.add_middleware(profiling.ProfilingMiddleware)
+profiling.instrument_engine(engine)
+
 # Create upload directory
 UPLOAD_DIR = Path("uploads")
 UPLOAD_DIR.mkdir(exist_ok=True)
 
+ALLOWED_EXTENSIONS = {'.pdf', '.jpg', '.jpeg', '.png', '.tiff', '.bmp'}
+
+# Batch upload limits
+MAX_BATCH_FILES = int(os.getenv("MAX_BATCH_FILES", "1000"))
+MAX_ARCHIVE_MEMBER_BYTES = int(os.getenv("MAX_ARCHIVE_MEMBER_BYTES", str(50 * 1024 * 1024)))
+TERMINAL_EXTRACTION_STATUSES = {"completed", "failed", "no_w2_detected"}
+
 # Mount static files
 app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
 
@@ -159,9 +215,6 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 30
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
-# Initialize W2 extractor
-w2_extractor = W2Extractor()
-
 # Database dependency
 def get_db():
     db = SessionLocal()
@@ -206,42 +259,44 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
         raise credentials_exception
     return user
 
-# Background task for W2 processing
-async def process_w2_extraction(document_id: int, file_path: str, db: Session):
-    """Background task to process W2 extraction"""
-    try:
-        # Update document status
-        document = db.query(Document).filter(Document.id == document_id).first()
-        if document:
-            document.extraction_status = "processing"
-            db.commit()
-
-        # Process the document
-        result = w2_extractor.process_document(file_path)
-
-        if result['is_w2'] and not result.get('error'):
-            # Create W2 form record
-            w2_data = W2Form(
-                user_id=document.user_id,
-                document_id=document_id,
-                raw_extracted_data=result,
-                confidence_score=result['confidence'],
-                **result['extracted_fields']
-            )
-            db.add(w2_data)
-            document.extraction_status = "completed"
-            document.processed = True
-        else:
-            document.extraction_status = "no_w2_detected" if not result['is_w2'] else "failed"
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    if not profiling.ADMIN_TOKEN or not x_admin_token or not secrets.compare_digest(x_admin_token, profiling.ADMIN_TOKEN):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin token required")
 
-        db.commit()
+def check_extraction_capacity(user_id: int, count: int = 1):
+    """Reject uploads with 429 + Retry-After while the extraction queue is full"""
+    try:
+        extraction.check_admission(user_id, count)
+    except QueueFull as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Extraction queue is full, please retry later",
+            headers={"Retry-After": str(e.retry_after)},
+        )
 
-    except Exception as e:
-        # Update document status to failed
-        document = db.query(Document).filter(Document.id == document_id).first()
-        if document:
-            document.extraction_status = "failed"
-            db.commit()
+def save_batch_member(source, batch_dir: Path, index: int, filename: str) -> Path:
+    """Copy one uploaded file or archive member to disk without buffering it whole"""
+    file_path = batch_dir / f"{index:04d}_{filename}"
+    with open(file_path, 'wb') as out:
+        shutil.copyfileobj(source, out, 1024 * 1024)
+    return file_path
+
+def batch_progress(db: Session, batch: UploadBatch) -> dict:
+    """Aggregate extraction status counts for a batch"""
+    rows = db.query(Document.extraction_status, func.count(Document.id)).filter(
+        Document.batch_id == batch.id
+    ).group_by(Document.extraction_status).all()
+    status_counts = {status_name: count for status_name, count in rows}
+    finished = sum(count for status_name, count in status_counts.items()
+                   if status_name in TERMINAL_EXTRACTION_STATUSES)
+    return {
+        "batch_id": batch.id,
+        "total_files": batch.total_files,
+        "status_counts": status_counts,
+        "finished_files": finished,
+        "progress": finished / batch.total_files if batch.total_files else 1.0,
+        "created_at": batch.created_at,
+    }
 
 # Routes
 @app.post("/register", response_model=UserResponse)
@@ -285,20 +340,20 @@ def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depend
 def read_users_me(current_user: User = Depends(get_current_user)):
     return current_user
 
-@app.post("/documents/upload", response_model=DocumentResponse)
+@app.post("/documents/upload", response_model=DocumentUploadResponse)
 async def upload_document(
-    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     # Validate file type
-    allowed_extensions = {'.pdf', '.jpg', '.jpeg', '.png', '.tiff', '.bmp'}
     file_ext = Path(file.filename).suffix.lower()
 
-    if file_ext not in allowed_extensions:
+    if file_ext not in ALLOWED_EXTENSIONS:
         raise HTTPException(status_code=400, detail="Unsupported file type")
 
+    check_extraction_capacity(current_user.id)
+
     # Create unique filename
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     filename = f"{current_user.id}_{timestamp}_{file.filename}"
@@ -318,21 +373,129 @@ async def upload_document(
         extraction_status="pending"
     )
     db.add(document)
+    versioning.bump_version(db, current_user.id, versioning.DOCUMENTS)
     db.commit()
     db.refresh(document)
 
-    # Add background task for W2 processing
-    background_tasks.add_task(process_w2_extraction, document.id, str(file_path), db)
+    # Queue W2 processing (in-process, or left pending for worker.py); cost
+    # estimation reads the file, so keep it off the event loop
+    schedule = await run_in_threadpool(
+        extraction.enqueue_extraction, current_user.id, [(document.id, str(file_path), file_ext)]
+    )
+
+    return {**DocumentResponse.model_validate(document).model_dump(), **schedule}
+
+@app.post("/documents/upload/batch", response_model=BatchUploadResponse)
+def upload_document_batch(
+    files: List[UploadFile] = File(...),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Upload many documents (and/or zip archives of documents) in one request"""
+    check_extraction_capacity(current_user.id, len(files))
+
+    batch_id = uuid.uuid4().hex
+    batch_dir = UPLOAD_DIR / f"{current_user.id}_batch_{batch_id}"
+    batch_dir.mkdir(parents=True, exist_ok=True)
+
+    documents = []
+    rejected = []
+
+    def add_document(source, filename: str):
+        if len(documents) >= MAX_BATCH_FILES:
+            rejected.append(f"{filename}: batch file limit reached")
+            return
+        file_path = save_batch_member(source, batch_dir, len(documents), filename)
+        documents.append(Document(
+            user_id=current_user.id,
+            batch_id=batch_id,
+            filename=filename,
+            file_path=str(file_path),
+            file_type=Path(filename).suffix.lower(),
+            extraction_status="pending"
+        ))
+
+    for upload in files:
+        filename = Path(upload.filename or "").name
+        file_ext = Path(filename).suffix.lower()
+
+        if file_ext == ".zip":
+            try:
+                with zipfile.ZipFile(upload.file) as archive:
+                    # Members are decompressed one at a time straight to disk
+                    for member in archive.infolist():
+                        member_name = Path(member.filename).name
+                        if member.is_dir() or not member_name or member.filename.startswith("__MACOSX/"):
+                            continue
+                        if Path(member_name).suffix.lower() not in ALLOWED_EXTENSIONS:
+                            rejected.append(f"{filename}/{member.filename}: unsupported file type")
+                            continue
+                        if member.file_size > MAX_ARCHIVE_MEMBER_BYTES:
+                            rejected.append(f"{filename}/{member.filename}: file too large")
+                            continue
+                        with archive.open(member) as source:
+                            add_document(source, member_name)
+            except zipfile.BadZipFile:
+                rejected.append(f"{filename}: invalid zip archive")
+        elif file_ext in ALLOWED_EXTENSIONS:
+            add_document(upload.file, filename)
+        else:
+            rejected.append(f"{filename}: unsupported file type")
+
+    if not documents:
+        shutil.rmtree(batch_dir, ignore_errors=True)
+        raise HTTPException(status_code=400, detail={"message": "No supported files in upload", "rejected_files": rejected})
+
+    # Archives may expand to more documents than files were sent
+    try:
+        check_extraction_capacity(current_user.id, len(documents))
+    except HTTPException:
+        shutil.rmtree(batch_dir, ignore_errors=True)
+        raise
+
+    # One transaction for the batch row and every document row
+    batch = UploadBatch(id=batch_id, user_id=current_user.id, total_files=len(documents))
+    db.add(batch)
+    db.add_all(documents)
+    versioning.bump_version(db, current_user.id, versioning.DOCUMENTS)
+    db.flush()
+    jobs = [(document.id, document.file_path, document.file_type) for document in documents]
+    db.commit()
+
+    schedule = extraction.enqueue_extraction(current_user.id, jobs)
 
-    return document
+    return {**batch_progress(db, batch), **schedule, "rejected_files": rejected}
+
+@app.get("/documents/batches/{batch_id}", response_model=BatchProgressResponse)
+def get_batch_progress(
+    batch_id: str,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    batch = db.query(UploadBatch).filter(
+        UploadBatch.id == batch_id,
+        UploadBatch.user_id == current_user.id
+    ).first()
+
+    if not batch:
+        raise HTTPException(status_code=404, detail="Batch not found")
+
+    return batch_progress(db, batch)
 
 @app.get("/documents", response_model=List[DocumentResponse])
 def get_documents(
+    request: Request,
+    response: Response,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    documents = db.query(Document).filter(Document.user_id == current_user.id).all()
-    return documents
+    not_modified = versioning.not_modified_response(request, response, db, current_user.id, versioning.DOCUMENTS)
+    if not_modified:
+        return not_modified
+
+    return serialization.list_response(
+        db, Document, DocumentResponse, [Document.user_id == current_user.id], response
+    )
 
 @app.get("/documents/{document_id}/w2", response_model=W2FormResponse)
 def get_w2_data(
@@ -350,7 +513,7 @@ def get_w2_data(
         raise HTTPException(status_code=404, detail="Document not found")
 
     # Get W2 data
-    w2_form = db.query(W2Form).filter(W2Form.document_id == document_id).first()
+    w2_form = db.query(W2Form).filter(W2Form.document_id == document_id).order_by(W2Form.page_number, W2Form.id).first()
 
     if not w2_form:
         raise HTTPException(status_code=404, detail="No W2 data found for this document")
@@ -359,11 +522,47 @@ def get_w2_data(
 
 @app.get("/w2-forms", response_model=List[W2FormResponse])
 def get_user_w2_forms(
+    request: Request,
+    response: Response,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    w2_forms = db.query(W2Form).filter(W2Form.user_id == current_user.id).all()
-    return w2_forms
+    not_modified = versioning.not_modified_response(request, response, db, current_user.id, versioning.W2_FORMS)
+    if not_modified:
+        return not_modified
+
+    return serialization.list_response(
+        db, W2Form, W2FormResponse, [W2Form.user_id == current_user.id], response
+    )
+
+def export_response(model, response_schema, criteria, name: str, export_format: str, compress: bool):
+    """Stream a user's rows as CSV/NDJSON without loading them into memory"""
+    if export_format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail="Unsupported export format")
+
+    media_type, extension = EXPORT_FORMATS[export_format]
+    filename = f"{name}.{extension}"
+    if compress:
+        media_type = "application/gzip"
+        filename += ".gz"
+
+    columns = list(response_schema.model_fields.keys())
+    return StreamingResponse(
+        export_stream(SessionLocal, model, columns, criteria, export_format, compress),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@app.get("/w2-forms/export")
+def export_w2_forms(
+    format: str = Query("csv", description="csv or ndjson"),
+    gzip: bool = False,
+    current_user: User = Depends(get_current_user)
+):
+    return export_response(
+        W2Form, W2FormResponse, [W2Form.user_id == current_user.id],
+        "w2_forms", format, gzip
+    )
 
 @app.post("/tax-returns", response_model=TaxReturnResponse)
 def create_tax_return(
@@ -399,17 +598,36 @@ def create_tax_return(
     )
 
     db.add(db_tax_return)
+    versioning.bump_version(db, current_user.id, versioning.TAX_RETURNS)
     db.commit()
     db.refresh(db_tax_return)
     return db_tax_return
 
 @app.get("/tax-returns", response_model=List[TaxReturnResponse])
 def get_tax_returns(
+    request: Request,
+    response: Response,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    tax_returns = db.query(TaxReturn).filter(TaxReturn.user_id == current_user.id).all()
-    return tax_returns
+    not_modified = versioning.not_modified_response(request, response, db, current_user.id, versioning.TAX_RETURNS)
+    if not_modified:
+        return not_modified
+
+    return serialization.list_response(
+        db, TaxReturn, TaxReturnResponse, [TaxReturn.user_id == current_user.id], response
+    )
+
+@app.get("/tax-returns/export")
+def export_tax_returns(
+    format: str = Query("csv", description="csv or ndjson"),
+    gzip: bool = False,
+    current_user: User = Depends(get_current_user)
+):
+    return export_response(
+        TaxReturn, TaxReturnResponse, [TaxReturn.user_id == current_user.id],
+        "tax_returns", format, gzip
+    )
 
 @app.post("/payments", response_model=PaymentResponse)
 def create_payment(
@@ -439,39 +657,50 @@ def create_payment(
     db.refresh(db_payment)
     return db_payment
 
+@app.get("/admin/profiles", dependencies=[Depends(require_admin)])
+def get_slow_request_profiles():
+    """Slowest profiled requests, slowest first"""
+    return {"profiles": profiling.SLOW_REQUESTS.slowest()}
+
+@app.delete("/admin/profiles", dependencies=[Depends(require_admin)])
+def clear_slow_request_profiles():
+    profiling.SLOW_REQUESTS.clear()
+    return {"cleared": True}
+
+@app.get("/metrics", include_in_schema=False)
+def metrics_endpoint():
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
+
 @app.get("/health")
 def health_check():
     return {"status": "healthy", "timestamp": datetime.utcnow()}
 
+@app.get("/health/ready")
+def readiness_check():
+    """Readiness: the database answers a pooled SELECT 1 within the probe timeout"""
+    probe = health.probe_database()
+    body = {"status": "ready" if probe["status"] == "healthy" else "not_ready", "database": probe,
+            "timestamp": datetime.utcnow().isoformat()}
+    return JSONResponse(body, status_code=200 if probe["status"] == "healthy" else 503)
+
 @app.get("/health/db")
 def database_health_check():
-    """Check database connectivity and table existence"""
-    try:
-        with SessionLocal() as db:
-            # Test connection
-            db.execute(text("SELECT 1"))
-            
-            # Check each table
-            tables_status = {}
-            for table_name in ['users', 'documents', 'tax_returns', 'payments', 'w2_forms']:
-                try:
-                    result = db.execute(text(f"SELECT COUNT(*) FROM {table_name}"))
-                    count = result.scalar()
-                    tables_status[table_name] = {"exists": True, "count": count}
-                except Exception as e:
-                    tables_status[table_name] = {"exists": False, "error": str(e)}
-            
-            return {
-                "database_status": "healthy",
-                "tables": tables_status,
-                "timestamp": datetime.utcnow()
-            }
-    except Exception as e:
-        return {
-            "database_status": "unhealthy",
-            "error": str(e),
-            "timestamp": datetime.utcnow()
-        }
+    """Check database connectivity; table statistics come from the background cache"""
+    probe = health.probe_database()
+    stats = health.TABLE_STATS.snapshot()
+    result = {
+        "database_status": probe["status"],
+        "latency_ms": probe["latency_ms"],
+        "tables": stats["tables"],
+        "stats_refreshed_at": stats["refreshed_at"],
+        "stats_age_seconds": stats["age_seconds"],
+        "timestamp": datetime.utcnow()
+    }
+    if "error" in probe:
+        result["error"] = probe["error"]
+    if "refresh_error" in stats:
+        result["stats_error"] = stats["refresh_error"]
+    return result
 
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
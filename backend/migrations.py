@@ -0,0 +1,35 @@
+"""Schema upgrades for databases created by earlier releases.
+
+``init_database`` only creates tables that are missing, so columns added to
+existing models later are added here with ``ALTER TABLE ... ADD COLUMN``.
+Every step checks the live schema first, so running it again is a no-op.
+"""
+from typing import List
+
+from sqlalchemy import inspect, text
+
+
+def add_missing_columns(engine, metadata) -> List[str]:
+    """Add model columns (and their indexes) missing from existing tables; returns "table.column" names added"""
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    added = []
+    with engine.begin() as conn:
+        for table in metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            present = {column["name"] for column in inspector.get_columns(table.name)}
+            new_columns = [column for column in table.columns if column.name not in present]
+            for column in new_columns:
+                column_type = column.type.compile(dialect=engine.dialect)
+                default = ""
+                if column.server_default is not None:
+                    default = f" DEFAULT {column.server_default.arg}"
+                conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}{default}"))
+                added.append(f"{table.name}.{column.name}")
+
+            new_names = {column.name for column in new_columns}
+            for index in table.indexes:
+                if new_names.intersection(column.name for column in index.columns):
+                    index.create(conn, checkfirst=True)
+    return added
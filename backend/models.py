@@ -17,6 +17,7 @@ class User(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
 
     documents = relationship("Document", back_populates="user")
+    upload_batches = relationship("UploadBatch", back_populates="user")
     tax_returns = relationship("TaxReturn", back_populates="user")
     payments = relationship("Payment", back_populates="user")
     w2_forms = relationship("W2Form", back_populates="user")
@@ -29,11 +30,26 @@ class Document(Base):
     filename = Column(String)
     file_path = Column(String)
     file_type = Column(String)
+    batch_id = Column(String, ForeignKey("upload_batches.id"), index=True, nullable=True)
     uploaded_at = Column(DateTime, default=datetime.utcnow)
     processed = Column(Boolean, default=False)
     extraction_status = Column(String, default="pending")  # pending, processing, completed, failed
+    claimed_at = Column(DateTime, nullable=True)  # when extraction last started; stale "processing" rows are re-queued
+    extraction_attempts = Column(Integer, nullable=False, default=0, server_default="0")
 
     user = relationship("User", back_populates="documents")
+    batch = relationship("UploadBatch", back_populates="documents")
+
+class UploadBatch(Base):
+    __tablename__ = "upload_batches"
+
+    id = Column(String, primary_key=True)  # uuid4 hex
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
+    total_files = Column(Integer, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    user = relationship("User", back_populates="upload_batches")
+    documents = relationship("Document", back_populates="batch")
 
 class W2Form(Base):
     __tablename__ = "w2_forms"
@@ -41,6 +57,7 @@ class W2Form(Base):
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
     document_id = Column(Integer, ForeignKey("documents.id"))
+    page_number = Column(Integer)  # First page of this form within the document
 
     # Employer Information
     employer_name = Column(String)
@@ -114,3 +131,12 @@ class Payment(Base):
 
     user = relationship("User", back_populates="payments")
     tax_return = relationship("TaxReturn", back_populates="payments")
+
+class CollectionVersion(Base):
+    __tablename__ = "collection_versions"
+
+    # One counter per user and list endpoint (documents, w2_forms, tax_returns)
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    collection = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -0,0 +1,244 @@
+"""Opt-in request profiling.
+
+A request is profiled when it carries ``X-Profile: <ADMIN_TOKEN>`` or is
+picked by ``PROFILE_SAMPLE_RATE``. While it runs, a background thread samples
+the Python stacks of the threads serving it and every SQL statement issued in
+the request context is recorded. The slowest profiled requests are kept in a
+bounded in-memory buffer served by the admin endpoint.
+"""
+import heapq
+import itertools
+import os
+import random
+import secrets
+import sys
+import threading
+import time
+import contextvars
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+PROFILE_HEADER = b"x-profile"
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_INTERVAL_SECONDS = float(os.getenv("PROFILE_INTERVAL_MS", "5")) / 1000.0
+PROFILE_KEEP_SLOWEST = int(os.getenv("PROFILE_KEEP_SLOWEST", "20"))
+PROFILE_MAX_STATEMENTS = 200
+PROFILE_MAX_STACKS = 50
+PROFILE_MAX_STACK_DEPTH = 40
+
+# Innermost frames that mean a thread is parked rather than doing work
+IDLE_FUNCTIONS = {"wait", "select", "poll", "epoll", "accept", "run_forever", "_run_once"}
+
+_active_profile: contextvars.ContextVar[Optional["RequestProfile"]] = contextvars.ContextVar(
+    "active_request_profile", default=None)
+
+
+class RequestProfile:
+    def __init__(self, method: str, path: str, trigger: str):
+        self.method = method
+        self.path = path
+        self.trigger = trigger
+        self.started_at = datetime.utcnow()
+        self.start = time.perf_counter()
+        self.duration = None
+        self.status_code = None
+        self.route = None
+        self.statements: List[Dict[str, Any]] = []
+        self.statement_count = 0
+        self.statement_seconds = 0.0
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.thread_ids = set()
+        self._lock = threading.Lock()
+
+    @property
+    def finished(self) -> bool:
+        return self.duration is not None
+
+    def add_thread(self, thread_id: int) -> None:
+        with self._lock:
+            self.thread_ids.add(thread_id)
+
+    def threads(self) -> List[int]:
+        with self._lock:
+            return list(self.thread_ids)
+
+    def record_statement(self, statement: str, elapsed: float) -> None:
+        with self._lock:
+            self.statement_count += 1
+            self.statement_seconds += elapsed
+            if len(self.statements) < PROFILE_MAX_STATEMENTS:
+                self.statements.append({
+                    "statement": " ".join(statement.split())[:1000],
+                    "duration_ms": round(elapsed * 1000, 3),
+                })
+
+    def record_sample(self, stacks: List[str]) -> None:
+        with self._lock:
+            if self.finished:
+                return
+            self.samples += 1
+            self.stacks.update(stacks)
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            statements = list(self.statements)
+            stacks = self.stacks.most_common(PROFILE_MAX_STACKS)
+        return {
+            "method": self.method,
+            "path": self.path,
+            "route": self.route,
+            "status_code": self.status_code,
+            "trigger": self.trigger,
+            "started_at": self.started_at.isoformat(),
+            "duration_ms": round((self.duration or 0) * 1000, 3),
+            "sql_count": self.statement_count,
+            "sql_time_ms": round(self.statement_seconds * 1000, 3),
+            "sql": statements,
+            "stack_samples": self.samples,
+            "stacks": [
+                {"stack": stack, "count": count}
+                for stack, count in stacks
+            ],
+        }
+
+
+class StackSampler(threading.Thread):
+    """Periodically fold the Python stacks of the request's threads into a profile.
+
+    Samples only the threads recorded on the profile: the event loop thread
+    that received the request, and threadpool threads once they issue SQL for
+    it. A pool thread keeps being sampled after it moves on to other work.
+    """
+
+    def __init__(self, profile: RequestProfile, interval: float = PROFILE_INTERVAL_SECONDS):
+        super().__init__(name="request-profiler", daemon=True)
+        self.profile = profile
+        self.interval = interval
+        self._stop_event = threading.Event()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+    def run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            frames = sys._current_frames()
+            folded = [
+                self._fold(frame) for frame in map(frames.get, self.profile.threads())
+                if frame is not None and frame.f_code.co_name not in IDLE_FUNCTIONS
+            ]
+            self.profile.record_sample(folded)
+
+    @staticmethod
+    def _fold(frame) -> str:
+        parts = []
+        while frame is not None and len(parts) < PROFILE_MAX_STACK_DEPTH:
+            code = frame.f_code
+            parts.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}")
+            frame = frame.f_back
+        return ";".join(reversed(parts))
+
+
+class SlowRequestBuffer:
+    """Keeps the N slowest finished profiles"""
+
+    def __init__(self, size: int = PROFILE_KEEP_SLOWEST):
+        self.size = size
+        self._heap: List = []
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+
+    def add(self, profile: RequestProfile) -> None:
+        entry = (profile.duration, next(self._counter), profile)
+        with self._lock:
+            if len(self._heap) < self.size:
+                heapq.heappush(self._heap, entry)
+            elif entry[0] > self._heap[0][0]:
+                heapq.heapreplace(self._heap, entry)
+
+    def slowest(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            entries = sorted(self._heap, reverse=True)
+        return [profile.to_dict() for _, _, profile in entries]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._heap.clear()
+
+
+SLOW_REQUESTS = SlowRequestBuffer()
+
+
+def instrument_engine(engine) -> None:
+    """Record statements issued while a profiled request is active"""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        profile = _active_profile.get()
+        if profile is not None:
+            profile.add_thread(threading.get_ident())
+            conn.info.setdefault("profile_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        profile = _active_profile.get()
+        starts = conn.info.get("profile_query_start")
+        if profile is None or not starts:
+            return
+        elapsed = time.perf_counter() - starts.pop()
+        if not profile.finished:
+            profile.record_statement(statement, elapsed)
+
+
+def _profile_trigger(scope) -> Optional[str]:
+    if ADMIN_TOKEN:
+        for name, value in scope.get("headers", []):
+            if name == PROFILE_HEADER and secrets.compare_digest(value, ADMIN_TOKEN.encode("latin-1")):
+                return "header"
+    if PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE:
+        return "sample"
+    return None
+
+
+class ProfilingMiddleware:
+    """ASGI middleware profiling opted-in requests up to the end of the response body"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        trigger = _profile_trigger(scope) if scope["type"] == "http" else None
+        if trigger is None:
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(scope["method"], scope["path"], trigger)
+        profile.add_thread(threading.get_ident())
+        sampler = StackSampler(profile)
+        token = _active_profile.set(profile)
+        sampler.start()
+
+        def finish():
+            if profile.finished:
+                return
+            profile.duration = time.perf_counter() - profile.start
+            profile.route = getattr(scope.get("route"), "path", None)
+            sampler.stop()
+            SLOW_REQUESTS.add(profile)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                profile.status_code = message["status"]
+            await send(message)
+            # Background tasks run after the body; they are not part of the request
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                finish()
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            finish()
+            _active_profile.reset(token)
@@ -0,0 +1,282 @@
+"""Bounded, cost-aware, per-user fair scheduler for in-process extraction.
+
+Uploads are admitted into a bounded queue (globally and per user) and run on
+a fixed pool of worker threads. Each job gets a cost estimate from its file
+type, size and page count. The next job is taken from the user with the least
+served cost plus the cost of their cheapest pending job, so small single-page
+W-2s overtake big scanned packets and one user's bulk upload cannot starve
+everyone else.
+"""
+import heapq
+import itertools
+import logging
+import math
+import os
+import re
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import metrics
+from services.pdf_text import PDFDocument, Stream
+
+logger = logging.getLogger(__name__)
+
+EXTRACTION_QUEUE_MAX = int(os.getenv("EXTRACTION_QUEUE_MAX", "2000"))
+EXTRACTION_QUEUE_MAX_PER_USER = int(os.getenv("EXTRACTION_QUEUE_MAX_PER_USER", "1000"))
+EXTRACTION_THREADS = int(os.getenv("EXTRACTION_THREADS", "2"))
+
+# Rough seconds per unit of work, refined from observed run times
+IMAGE_BASE_COST = 2.0
+IMAGE_COST_PER_MB = 0.5
+TEXT_PDF_PAGE_COST = 0.05
+SCANNED_PDF_PAGE_COST = 2.5
+PDF_SCAN_CHUNK = 1024 * 1024
+# Larger PDFs are priced from a byte scan instead of their page tree
+PDF_PARSE_MAX_BYTES = 64 * 1024 * 1024
+
+_PAGE_PATTERN = re.compile(rb"/Type\s*/Page(?!s)")
+
+
+class QueueFull(Exception):
+    def __init__(self, retry_after: int):
+        super().__init__("Extraction queue is full")
+        self.retry_after = retry_after
+
+
+def estimate_cost(file_path: str, file_type: str) -> Tuple[float, int]:
+    """Estimated seconds of work and page count for a document"""
+    try:
+        size = os.path.getsize(file_path)
+    except OSError:
+        size = 0
+
+    if file_type != ".pdf":
+        return IMAGE_BASE_COST + IMAGE_COST_PER_MB * size / (1024 * 1024), 1
+
+    if size <= PDF_PARSE_MAX_BYTES:
+        try:
+            return _pdf_cost_from_page_tree(file_path)
+        except Exception as e:
+            logger.debug(f"Pricing {file_path} from a byte scan: {e}")
+    return _pdf_cost_from_bytes(file_path)
+
+
+def _has_fonts(document: PDFDocument, resources, depth: int = 0) -> bool:
+    """Whether a page (or a form XObject it draws) has fonts, i.e. a text layer"""
+    resources = document.resolve(resources)
+    if not isinstance(resources, dict):
+        return False
+    if document.resolve(resources.get("Font")):
+        return True
+    xobjects = document.resolve(resources.get("XObject"))
+    if depth >= 4 or not isinstance(xobjects, dict):
+        return False
+    for xobject in map(document.resolve, xobjects.values()):
+        if isinstance(xobject, Stream) and xobject.attrs.get("Subtype") == "Form" \
+                and _has_fonts(document, xobject.attrs.get("Resources"), depth + 1):
+            return True
+    return False
+
+
+def _pdf_cost_from_page_tree(file_path: str) -> Tuple[float, int]:
+    """Price each page from the page tree, which also covers compressed object streams"""
+    with open(file_path, "rb") as f:
+        document = PDFDocument(f.read())
+    pages = document.pages()
+    if not pages:
+        raise ValueError("empty page tree")
+    cost = sum(TEXT_PDF_PAGE_COST if _has_fonts(document, resources) else SCANNED_PDF_PAGE_COST
+               for _, resources in pages)
+    return cost, len(pages)
+
+
+def _pdf_cost_from_bytes(file_path: str) -> Tuple[float, int]:
+    """Count page objects and look for fonts without parsing the PDF"""
+    pages = 0
+    has_fonts = False
+    tail = b""
+    try:
+        with open(file_path, "rb") as f:
+            while True:
+                chunk = f.read(PDF_SCAN_CHUNK)
+                if not chunk:
+                    break
+                window = tail + chunk
+                pages += len(_PAGE_PATTERN.findall(window)) - len(_PAGE_PATTERN.findall(tail))
+                has_fonts = has_fonts or b"/Font" in window
+                tail = chunk[-32:]
+    except OSError:
+        pass
+
+    pages = max(1, pages)
+    return pages * (TEXT_PDF_PAGE_COST if has_fonts else SCANNED_PDF_PAGE_COST), pages
+
+
+class ExtractionJob:
+    def __init__(self, document_id: int, file_path: str, user_id: int, cost: float, pages: int):
+        self.document_id = document_id
+        self.file_path = file_path
+        self.user_id = user_id
+        self.cost = cost
+        self.pages = pages
+        self.enqueued_at = time.monotonic()
+
+
+class ExtractionScheduler:
+    def __init__(self, run_job, threads: int = EXTRACTION_THREADS, max_queue: int = EXTRACTION_QUEUE_MAX,
+                 max_per_user: int = EXTRACTION_QUEUE_MAX_PER_USER):
+        self.run_job = run_job
+        self.threads = max(1, threads)
+        self.max_queue = max_queue
+        self.max_per_user = max_per_user
+
+        self._condition = threading.Condition()
+        self._pending: Dict[int, List] = {}     # user_id -> heap of (cost, seq, job)
+        self._served: Dict[int, float] = {}     # user_id -> cost served (virtual time)
+        self._running: Dict[int, ExtractionJob] = {}
+        self._queued = 0
+        self._queued_cost = 0.0
+        self._virtual_time = 0.0
+        self._seconds_per_cost = 1.0
+        self._sequence = itertools.count()
+        self._workers: List[threading.Thread] = []
+        self._stopping = False
+
+    # Admission
+
+    def check_admission(self, user_id: int, count: int = 1) -> None:
+        """Raise QueueFull if `count` more jobs for this user would not fit"""
+        with self._condition:
+            user_queued = len(self._pending.get(user_id, ()))
+            if self._queued + count > self.max_queue or user_queued + count > self.max_per_user:
+                raise QueueFull(self._retry_after())
+
+    def submit(self, jobs: List[ExtractionJob]) -> Dict[str, Optional[float]]:
+        """Queue admitted jobs; returns the worst queue position and ETA among them"""
+        self._ensure_started()
+        with self._condition:
+            for job in jobs:
+                heap = self._pending.setdefault(job.user_id, [])
+                if not heap and job.user_id not in self._running_users():
+                    # A user returning from idle starts at the current virtual time
+                    self._served[job.user_id] = max(self._served.get(job.user_id, 0.0), self._virtual_time)
+                heapq.heappush(heap, (job.cost, next(self._sequence), job))
+                self._queued += 1
+                self._queued_cost += job.cost
+            metrics.EXTRACTION_QUEUE_DEPTH.set(self._queued)
+            self._condition.notify(len(jobs))
+
+            positions = self._positions(jobs)
+            position, cost_ahead = max(positions.values()) if positions else (0, 0.0)
+            return {
+                "queue_position": position,
+                "estimated_wait_seconds": round(self._eta(cost_ahead), 1),
+            }
+
+    # Scheduling
+
+    def _running_users(self):
+        return {job.user_id for job in self._running.values()}
+
+    def _key(self, user_id: int) -> float:
+        return self._served.get(user_id, 0.0) + self._pending[user_id][0][0]
+
+    def _next_job(self) -> ExtractionJob:
+        user_id = min((uid for uid, heap in self._pending.items() if heap), key=self._key)
+        cost, _, job = heapq.heappop(self._pending[user_id])
+        if not self._pending[user_id]:
+            del self._pending[user_id]
+
+        self._served[user_id] = self._served.get(user_id, 0.0) + cost
+        self._virtual_time = max(self._virtual_time, self._served[user_id] - cost)
+        self._queued -= 1
+        self._queued_cost -= cost
+        return job
+
+    def _positions(self, targets: List[ExtractionJob]) -> Dict[int, Tuple[int, float]]:
+        """1-based queue position and cost of the work ahead of each target.
+
+        Picking the user with the least served cost plus their cheapest job
+        runs jobs in order of virtual finish time (served cost plus each user's
+        cumulative pending cost), so one sort gives the whole run order.
+        """
+        order = []
+        for user_id, heap in self._pending.items():
+            finish = self._served.get(user_id, 0.0)
+            for cost, sequence, job in sorted(heap):
+                finish += cost
+                order.append((finish, sequence, cost, job))
+        order.sort(key=lambda entry: (entry[0], entry[1]))
+
+        wanted = {id(job) for job in targets}
+        found = {}
+        cost_ahead = 0.0
+        for position, (_, _, cost, job) in enumerate(order, start=1):
+            if id(job) in wanted:
+                found[id(job)] = (position, cost_ahead)
+                if len(found) == len(wanted):
+                    break
+            cost_ahead += cost
+        return found
+
+    def _eta(self, cost_ahead: float) -> float:
+        running = sum(job.cost for job in self._running.values()) / 2
+        return (cost_ahead + running) * self._seconds_per_cost / self.threads
+
+    def _retry_after(self) -> int:
+        # Roughly the time until one queue slot frees up
+        average = self._queued_cost / self._queued if self._queued else 1.0
+        return max(1, math.ceil(average * self._seconds_per_cost / self.threads))
+
+    # Workers
+
+    def _ensure_started(self) -> None:
+        with self._condition:
+            if self._workers:
+                return
+            for index in range(self.threads):
+                worker = threading.Thread(target=self._work, name=f"extraction-{index}", daemon=True)
+                worker.start()
+                self._workers.append(worker)
+        metrics.EXTRACTION_WORKERS.set(self.threads)
+
+    def _work(self) -> None:
+        while True:
+            with self._condition:
+                while not self._queued and not self._stopping:
+                    self._condition.wait()
+                if self._stopping:
+                    return
+                job = self._next_job()
+                self._running[id(job)] = job
+                metrics.EXTRACTION_QUEUE_DEPTH.set(self._queued)
+
+            started = time.perf_counter()
+            try:
+                self.run_job(job)
+            except Exception:
+                # A failing job (e.g. the database is down) must not take the thread with it
+                logger.exception(f"Extraction job for document {job.document_id} failed")
+            finally:
+                elapsed = time.perf_counter() - started
+                with self._condition:
+                    del self._running[id(job)]
+                    if job.cost > 0:
+                        # Exponentially weighted correction of the cost model
+                        self._seconds_per_cost = 0.9 * self._seconds_per_cost + 0.1 * (elapsed / job.cost)
+
+    def stats(self) -> Dict[str, float]:
+        with self._condition:
+            return {
+                "queued": self._queued,
+                "running": len(self._running),
+                "threads": self.threads,
+                "users_waiting": len(self._pending),
+                "estimated_drain_seconds": round(self._eta(self._queued_cost), 1),
+            }
+
+    def shutdown(self) -> None:
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
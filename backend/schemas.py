@@ -1,6 +1,6 @@
 from pydantic import BaseModel, EmailStr
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 
 class UserCreate(BaseModel):
     email: EmailStr
@@ -25,10 +25,29 @@ class DocumentResponse(BaseModel):
     uploaded_at: datetime
     processed: bool
     extraction_status: str
+    batch_id: Optional[str] = None
 
     class Config:
         from_attributes = True
 
+class DocumentUploadResponse(DocumentResponse):
+    # Extraction queue position/ETA; None when a separate worker owns extraction
+    queue_position: Optional[int] = None
+    estimated_wait_seconds: Optional[float] = None
+
+class BatchProgressResponse(BaseModel):
+    batch_id: str
+    total_files: int
+    status_counts: Dict[str, int]
+    finished_files: int
+    progress: float
+    created_at: datetime
+
+class BatchUploadResponse(BatchProgressResponse):
+    rejected_files: List[str] = []
+    queue_position: Optional[int] = None
+    estimated_wait_seconds: Optional[float] = None
+
 class W2FormCreate(BaseModel):
     document_id: int
     employer_name: Optional[str] = None
@@ -58,6 +77,7 @@ class W2FormCreate(BaseModel):
 class W2FormResponse(BaseModel):
     id: int
     document_id: int
+    page_number: Optional[int] = None
     employer_name: Optional[str]
     employer_address: Optional[str]
     employer_ein: Optional[str]
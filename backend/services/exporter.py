@@ -0,0 +1,92 @@
+import csv
+import io
+import json
+import zlib
+from datetime import date, datetime
+from typing import Any, Callable, Iterable, Iterator, List, Sequence
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+# Rows fetched per round trip from the server-side cursor
+EXPORT_BATCH_SIZE = 1000
+
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+}
+
+
+def _to_json_value(value: Any) -> Any:
+    """Convert database values to something json/csv can write"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def stream_rows(session_factory: Callable[[], Session], model, columns: Sequence[str],
+                *criteria, batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[List[Sequence[Any]]]:
+    """Yield batches of column tuples using a server-side cursor.
+
+    The session is owned by the generator so the cursor stays open for as long
+    as the response is being streamed, independent of the request scope.
+    """
+    statement = (
+        select(*[getattr(model, name) for name in columns])
+        .where(*criteria)
+        .order_by(model.id)
+        .execution_options(yield_per=batch_size, stream_results=True)
+    )
+    with session_factory() as db:
+        result = db.execute(statement)
+        for partition in result.partitions():
+            yield partition
+
+
+def iter_csv(batches: Iterable[List[Sequence[Any]]], columns: Sequence[str]) -> Iterator[bytes]:
+    """Encode row batches as CSV, one chunk per batch"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    yield buffer.getvalue().encode('utf-8')
+
+    for batch in batches:
+        buffer.seek(0)
+        buffer.truncate(0)
+        writer.writerows([[_to_json_value(value) for value in row] for row in batch])
+        yield buffer.getvalue().encode('utf-8')
+
+
+def iter_ndjson(batches: Iterable[List[Sequence[Any]]], columns: Sequence[str]) -> Iterator[bytes]:
+    """Encode row batches as newline-delimited JSON, one chunk per batch"""
+    for batch in batches:
+        lines = [
+            json.dumps({name: _to_json_value(value) for name, value in zip(columns, row)})
+            for row in batch
+        ]
+        lines.append('')
+        yield '\n'.join(lines).encode('utf-8')
+
+
+def gzip_chunks(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    """Compress a chunk stream incrementally into a single gzip member"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def export_stream(session_factory: Callable[[], Session], model, columns: Sequence[str],
+                  criteria: Sequence[Any], export_format: str, compress: bool = False) -> Iterator[bytes]:
+    """Build the byte stream for an export in the requested format"""
+    batches = stream_rows(session_factory, model, columns, *criteria)
+    if export_format == 'csv':
+        chunks = iter_csv(batches, columns)
+    elif export_format == 'ndjson':
+        chunks = iter_ndjson(batches, columns)
+    else:
+        raise ValueError(f'Unsupported export format: {export_format}')
+
+    return gzip_chunks(chunks) if compress else chunks
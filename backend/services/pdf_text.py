@@ -0,0 +1,743 @@
+"""Lightweight reader for the text layer of digital PDFs.
+
+Reads only what W-2 field matching needs: the page tree, each page's content
+streams, its fonts and the text operators (BT/ET, Tf, Td/TD/Tm/T*, Tj/TJ/'/").
+Every shown string becomes a token with its position in page space, and tokens
+are grouped into lines (top to bottom, left to right) to rebuild the page text.
+Pages are read lazily so callers can stop as soon as they have what they need.
+
+Anything outside that subset (encryption, unsupported stream filters, fonts
+without a usable encoding) raises PDFTextError so callers can fall back to
+pdfplumber.
+"""
+import base64
+import math
+import re
+import zlib
+from collections import namedtuple
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+_WS = rb"\x00\t\n\x0c\r "
+_REGULAR = rb"[^\x00\t\n\x0c\r /\[\]()<>{}%]"
+
+_TOKEN = re.compile(
+    rb"[" + _WS + rb"]+|%[^\r\n]*"        # whitespace and comments (skipped)
+    rb"|/(" + _REGULAR + rb"*)"           # 1: name
+    rb"|(<<|>>|[\[\]{}])"                 # 2: delimiter
+    rb"|([(<])"                           # 3: string start
+    rb"|(" + _REGULAR + rb"+)"            # 4: number, keyword or operator
+)
+_NUMBER = re.compile(rb"[+-]?(?:\d+\.?\d*|\.\d+)$")
+_STRING_SPECIAL = re.compile(rb"[\\()]")
+_NOT_HEX = re.compile(rb"[^0-9A-Fa-f]")
+_NAME_ESCAPE = re.compile(rb"#([0-9A-Fa-f]{2})")
+_OBJ_HEADER = re.compile(rb"(?:^|(?<=[" + _WS + rb"]))(\d+)[" + _WS + rb"]+(\d+)[" + _WS + rb"]+obj\b")
+_ROOT = re.compile(rb"/Root[" + _WS + rb"]*(\d+)[" + _WS + rb"]+(\d+)[" + _WS + rb"]+R")
+_ENCRYPT = re.compile(rb"/Encrypt[" + _WS + rb"]*(?:\d|<<)")
+_INLINE_DATA = re.compile(rb"[" + _WS + rb"]ID[" + _WS + rb"]")
+_INLINE_END = re.compile(rb"[" + _WS + rb"]EI(?=[" + _WS + rb"]|$)")
+_CMAP_BFCHAR = re.compile(rb"beginbfchar(.*?)endbfchar", re.S)
+_CMAP_BFRANGE = re.compile(rb"beginbfrange(.*?)endbfrange", re.S)
+_CMAP_TOKEN = re.compile(rb"<([0-9A-Fa-f" + _WS + rb"]*)>|(\[)|(\])")
+
+_ESCAPES = {b"n": b"\n", b"r": b"\r", b"t": b"\t", b"b": b"\b", b"f": b"\f",
+            b"(": b"(", b")": b")", b"\\": b"\\"}
+
+IDENTITY = (1.0, 0.0, 0.0, 1.0, 0.0, 0.0)
+
+# Used when a font carries no widths (standard 14 fonts); roughly an average glyph
+DEFAULT_GLYPH_WIDTH = 500
+# TJ adjustments beyond this (thousandths of an em) are word gaps
+TJ_SPACE_THRESHOLD = 200
+MAX_FORM_DEPTH = 8
+MAX_BAD_CHAR_RATIO = 0.1
+
+# Glyph names used in /Differences arrays that are not a single character
+_GLYPH_NAMES = {
+    "space": " ", "exclam": "!", "quotedbl": '"', "numbersign": "#", "dollar": "$", "percent": "%",
+    "ampersand": "&", "quotesingle": "'", "quoteright": "'", "quoteleft": "'", "parenleft": "(",
+    "parenright": ")", "asterisk": "*", "plus": "+", "comma": ",", "hyphen": "-", "minus": "-",
+    "period": ".", "slash": "/", "colon": ":", "semicolon": ";", "less": "<", "equal": "=",
+    "greater": ">", "question": "?", "at": "@", "bracketleft": "[", "backslash": "\\",
+    "bracketright": "]", "underscore": "_", "braceleft": "{", "bar": "|", "braceright": "}",
+    "asciitilde": "~", "endash": "-", "emdash": "-", "bullet": "•", "zero": "0", "one": "1",
+    "two": "2", "three": "3", "four": "4", "five": "5", "six": "6", "seven": "7", "eight": "8",
+    "nine": "9",
+}
+
+_WIN_ANSI = [bytes([code]).decode("cp1252", "ignore") or chr(code) for code in range(256)]
+_MAC_ROMAN = [bytes([code]).decode("mac_roman") for code in range(256)]
+
+
+class PDFTextError(Exception):
+    """The PDF uses features outside what this reader supports"""
+
+
+class Name(str):
+    """A PDF name (without the leading slash)"""
+
+
+class Keyword(str):
+    """A bare keyword: delimiters, true/false/null, R, stream and content operators"""
+
+
+Ref = namedtuple("Ref", "num gen")
+
+
+class Stream:
+    def __init__(self, attrs: Dict[str, Any], raw: bytes):
+        self.attrs = attrs
+        self.raw = raw
+
+
+# Lexing and parsing
+
+def _literal_string(data: bytes, pos: int) -> Tuple[bytes, int]:
+    """Parse a (...) string; pos is just past the opening parenthesis"""
+    out = bytearray()
+    depth = 1
+    while True:
+        match = _STRING_SPECIAL.search(data, pos)
+        if match is None:
+            raise PDFTextError("unterminated string")
+        out += data[pos:match.start()]
+        pos = match.start()
+        char = data[pos:pos + 1]
+        if char == b"\\":
+            escape = data[pos + 1:pos + 2]
+            pos += 2
+            if escape in _ESCAPES:
+                out += _ESCAPES[escape]
+            elif escape in (b"\r", b"\n"):
+                # Line continuation
+                if escape == b"\r" and data[pos:pos + 1] == b"\n":
+                    pos += 1
+            elif escape and escape in b"01234567":
+                digits = escape
+                while len(digits) < 3 and data[pos:pos + 1] and data[pos:pos + 1] in b"01234567":
+                    digits += data[pos:pos + 1]
+                    pos += 1
+                out.append(int(digits, 8) & 0xFF)
+            else:
+                out += escape
+            continue
+        pos += 1
+        if char == b"(":
+            depth += 1
+        else:
+            depth -= 1
+            if depth == 0:
+                return bytes(out), pos
+        out += char
+
+
+def _hex_string(data: bytes, pos: int) -> Tuple[bytes, int]:
+    end = data.find(b">", pos)
+    if end < 0:
+        raise PDFTextError("unterminated hex string")
+    digits = _NOT_HEX.sub(b"", data[pos:end])
+    if len(digits) % 2:
+        digits += b"0"
+    return bytes.fromhex(digits.decode("ascii")), end + 1
+
+
+def _next_token(data: bytes, pos: int) -> Tuple[Any, int]:
+    """Next token at or after pos; None at the end of the data"""
+    while True:
+        match = _TOKEN.match(data, pos)
+        if match is None:
+            if pos >= len(data):
+                return None, pos
+            raise PDFTextError(f"unexpected byte at offset {pos}")
+        pos = match.end()
+        name, delimiter, string, regular = match.groups()
+        if regular is not None:
+            if _NUMBER.match(regular):
+                return (float(regular) if b"." in regular else int(regular)), pos
+            return Keyword(regular.decode("latin-1")), pos
+        if name is not None:
+            if b"#" in name:
+                name = _NAME_ESCAPE.sub(lambda m: bytes([int(m.group(1), 16)]), name)
+            return Name(name.decode("latin-1")), pos
+        if delimiter is not None:
+            return Keyword(delimiter.decode("latin-1")), pos
+        if string is not None:
+            return _literal_string(data, pos) if string == b"(" else _hex_string(data, pos)
+        # Whitespace or comment: keep scanning
+
+
+def _is_keyword(token: Any, value: str) -> bool:
+    return isinstance(token, Keyword) and token == value
+
+
+def _parse_object(data: bytes, pos: int, token: Any = None, refs: bool = True) -> Tuple[Any, int]:
+    """Parse one object, starting from `token` if it was already read"""
+    if token is None:
+        token, pos = _next_token(data, pos)
+    if isinstance(token, Keyword):
+        if token == "<<":
+            result = {}
+            while True:
+                key, pos = _next_token(data, pos)
+                if key is None:
+                    raise PDFTextError("unterminated dictionary")
+                if _is_keyword(key, ">>"):
+                    return result, pos
+                value, pos = _parse_object(data, pos, refs=refs)
+                if isinstance(key, Name):
+                    result[key] = value
+        if token == "[":
+            items = []
+            while True:
+                item, pos = _next_token(data, pos)
+                if item is None:
+                    raise PDFTextError("unterminated array")
+                if _is_keyword(item, "]"):
+                    return items, pos
+                value, pos = _parse_object(data, pos, item, refs)
+                items.append(value)
+        if token == "true":
+            return True, pos
+        if token == "false":
+            return False, pos
+        if token == "null":
+            return None, pos
+    elif refs and isinstance(token, int):
+        # "num gen R" is an indirect reference
+        generation, after_generation = _next_token(data, pos)
+        if isinstance(generation, int):
+            keyword, after_keyword = _next_token(data, after_generation)
+            if _is_keyword(keyword, "R"):
+                return Ref(token, generation), after_keyword
+    return token, pos
+
+
+# Document structure
+
+class PDFDocument:
+    def __init__(self, data: bytes):
+        if _ENCRYPT.search(data):
+            raise PDFTextError("encrypted PDF")
+        self.data = data
+        # Later definitions (incremental updates) replace earlier ones
+        self._offsets = {int(m.group(1)): m.start() for m in _OBJ_HEADER.finditer(data)}
+        self._objects: Dict[int, Any] = {}
+        self._object_streams_loaded = False
+
+    def get(self, num: int) -> Any:
+        if num in self._objects:
+            return self._objects[num]
+        offset = self._offsets.get(num)
+        if offset is None:
+            # Possibly compressed into an object stream (PDF 1.5+)
+            self._load_object_streams()
+            return self._objects.get(num)
+
+        pos = _OBJ_HEADER.match(self.data, offset).end()
+        value, pos = _parse_object(self.data, pos)
+        if isinstance(value, dict):
+            keyword, stream_start = _next_token(self.data, pos)
+            if _is_keyword(keyword, "stream"):
+                value = Stream(value, self._stream_data(value, stream_start))
+        self._objects[num] = value
+        return value
+
+    def resolve(self, value: Any) -> Any:
+        seen = 0
+        while isinstance(value, Ref):
+            seen += 1
+            if seen > 32:
+                raise PDFTextError("reference loop")
+            value = self.get(value.num)
+        return value
+
+    def _stream_data(self, attrs: Dict[str, Any], pos: int) -> bytes:
+        if self.data[pos:pos + 2] == b"\r\n":
+            pos += 2
+        elif self.data[pos:pos + 1] in (b"\r", b"\n"):
+            pos += 1
+
+        length = self.resolve(attrs.get("Length"))
+        if isinstance(length, int) and self.data[pos + length:pos + length + 32].lstrip().startswith(b"endstream"):
+            return self.data[pos:pos + length]
+
+        # Missing or wrong /Length: scan for the end marker
+        end = self.data.find(b"endstream", pos)
+        if end < 0:
+            raise PDFTextError("unterminated stream")
+        raw = self.data[pos:end]
+        if raw.endswith(b"\r\n"):
+            return raw[:-2]
+        return raw[:-1] if raw.endswith((b"\n", b"\r")) else raw
+
+    def decode(self, stream: Stream) -> bytes:
+        """Stream bytes with its filters applied"""
+        filters = self.resolve(stream.attrs.get("Filter"))
+        if filters is None:
+            return stream.raw
+        if not isinstance(filters, list):
+            filters = [filters]
+        params = self.resolve(stream.attrs.get("DecodeParms"))
+        if not isinstance(params, list):
+            params = [params] * len(filters)
+
+        data = stream.raw
+        for name, param in zip(filters, params):
+            param = self.resolve(param) or {}
+            if name in ("FlateDecode", "Fl"):
+                # decompressobj tolerates trailing garbage after the zlib stream
+                data = zlib.decompressobj().decompress(data)
+                data = self._unpredict(data, param)
+            elif name in ("ASCIIHexDecode", "AHx"):
+                data = _hex_string(data, 0)[0]
+            elif name in ("ASCII85Decode", "A85"):
+                data = data.strip()
+                if data.endswith(b"~>"):
+                    data = data[:-2]
+                data = base64.a85decode(data)
+            else:
+                raise PDFTextError(f"unsupported stream filter {name}")
+        return data
+
+    def _unpredict(self, data: bytes, param: Dict[str, Any]) -> bytes:
+        """Undo a PNG predictor (Predictor >= 10), as used by xref and object streams"""
+        predictor = self.resolve(param.get("Predictor", 1))
+        if predictor == 1:
+            return data
+        if predictor < 10:
+            raise PDFTextError(f"unsupported predictor {predictor}")
+        bits = self.resolve(param.get("Colors", 1)) * self.resolve(param.get("BitsPerComponent", 8))
+        columns = self.resolve(param.get("Columns", 1))
+        pixel = max(1, bits // 8)
+        width = (bits * columns + 7) // 8
+
+        output = bytearray()
+        previous = bytearray(width)
+        for start in range(0, len(data), width + 1):
+            kind, row = data[start], bytearray(data[start + 1:start + 1 + width])
+            if kind == 1:
+                for i in range(pixel, len(row)):
+                    row[i] = (row[i] + row[i - pixel]) & 0xFF
+            elif kind == 2:
+                for i in range(len(row)):
+                    row[i] = (row[i] + previous[i]) & 0xFF
+            elif kind == 3:
+                for i in range(len(row)):
+                    left = row[i - pixel] if i >= pixel else 0
+                    row[i] = (row[i] + (left + previous[i]) // 2) & 0xFF
+            elif kind == 4:
+                for i in range(len(row)):
+                    left = row[i - pixel] if i >= pixel else 0
+                    upper_left = previous[i - pixel] if i >= pixel else 0
+                    estimate = left + previous[i] - upper_left
+                    distances = (abs(estimate - left), abs(estimate - previous[i]), abs(estimate - upper_left))
+                    closest = (left, previous[i], upper_left)[distances.index(min(distances))]
+                    row[i] = (row[i] + closest) & 0xFF
+            elif kind != 0:
+                raise PDFTextError(f"bad PNG predictor row type {kind}")
+            output += row
+            previous = row
+        return bytes(output)
+
+    def _load_object_streams(self) -> None:
+        if self._object_streams_loaded:
+            return
+        self._object_streams_loaded = True
+        for num in list(self._offsets):
+            holder = self.get(num)
+            if not isinstance(holder, Stream) or holder.attrs.get("Type") != "ObjStm":
+                continue
+            data = self.decode(holder)
+            first = holder.attrs["First"]
+            header = data[:first].split()
+            for index in range(0, 2 * holder.attrs["N"], 2):
+                contained = int(header[index])
+                if contained in self._offsets or contained in self._objects:
+                    continue
+                self._objects[contained] = _parse_object(data, first + int(header[index + 1]))[0]
+
+    def pages(self) -> List[Tuple[Dict[str, Any], Dict[str, Any]]]:
+        """(page dict, inherited resources) for each page, in document order"""
+        roots = _ROOT.findall(self.data)
+        if not roots:
+            raise PDFTextError("no document catalog")
+        catalog = self.resolve(Ref(int(roots[-1][0]), int(roots[-1][1])))
+        if not isinstance(catalog, dict):
+            raise PDFTextError("no document catalog")
+
+        pages = []
+        seen = set()
+        stack = [(catalog.get("Pages"), {})]
+        while stack:
+            node_ref, inherited = stack.pop()
+            if isinstance(node_ref, Ref):
+                if node_ref.num in seen:
+                    continue
+                seen.add(node_ref.num)
+            node = self.resolve(node_ref)
+            if not isinstance(node, dict):
+                continue
+            resources = self.resolve(node.get("Resources", inherited)) or {}
+            kids = self.resolve(node.get("Kids"))
+            if node.get("Type") != "Page" and isinstance(kids, list):
+                stack.extend((kid, resources) for kid in reversed(kids))
+            else:
+                pages.append((node, resources))
+        return pages
+
+    def page_content(self, page: Dict[str, Any]) -> bytes:
+        contents = self.resolve(page.get("Contents"))
+        if contents is None:
+            return b""
+        if not isinstance(contents, list):
+            contents = [contents]
+        streams = [self.resolve(part) for part in contents]
+        return b"\n".join(self.decode(stream) for stream in streams if isinstance(stream, Stream))
+
+
+# Fonts
+
+def _utf16(data: bytes) -> str:
+    if len(data) % 2:
+        return data.decode("latin-1")
+    return data.decode("utf-16-be", "replace")
+
+
+def _parse_to_unicode(cmap: bytes) -> Dict[int, str]:
+    mapping = {}
+    for section in _CMAP_BFCHAR.findall(cmap):
+        values = [_NOT_HEX.sub(b"", m.group(1)) for m in _CMAP_TOKEN.finditer(section) if m.group(1) is not None]
+        for source, target in zip(values[::2], values[1::2]):
+            mapping[int(source or b"0", 16)] = _utf16(bytes.fromhex(target.decode("ascii")))
+
+    for section in _CMAP_BFRANGE.findall(cmap):
+        tokens = list(_CMAP_TOKEN.finditer(section))
+        index = 0
+        while index + 2 < len(tokens):
+            low = int(_NOT_HEX.sub(b"", tokens[index].group(1) or b"") or b"0", 16)
+            high = int(_NOT_HEX.sub(b"", tokens[index + 1].group(1) or b"") or b"0", 16)
+            high = min(high, low + 0xFFFF)
+            if tokens[index + 2].group(2):
+                # <low> <high> [<dst> <dst> ...]
+                index += 3
+                code = low
+                while index < len(tokens) and not tokens[index].group(3):
+                    if code <= high:
+                        mapping[code] = _utf16(bytes.fromhex(_NOT_HEX.sub(b"", tokens[index].group(1)).decode("ascii")))
+                    code += 1
+                    index += 1
+                index += 1
+                continue
+            # <low> <high> <dst>: consecutive codes map to consecutive characters
+            target = bytes.fromhex(_NOT_HEX.sub(b"", tokens[index + 2].group(1)).decode("ascii"))
+            start = int.from_bytes(target, "big") if target else 0
+            for offset in range(high - low + 1):
+                mapping[low + offset] = _utf16((start + offset).to_bytes(max(2, len(target)), "big"))
+            index += 3
+    return mapping
+
+
+def _glyph_char(name: str, fallback: str) -> str:
+    if len(name) == 1:
+        return name
+    if name in _GLYPH_NAMES:
+        return _GLYPH_NAMES[name]
+    for prefix, digits in (("uni", 4), ("u", 4)):
+        if name.startswith(prefix) and len(name) >= len(prefix) + digits:
+            try:
+                return chr(int(name[len(prefix):len(prefix) + digits], 16))
+            except ValueError:
+                break
+    return fallback
+
+
+class _Font:
+    def __init__(self, document: PDFDocument, font: Dict[str, Any]):
+        resolve = document.resolve
+        self.two_byte = font.get("Subtype") == "Type0"
+        to_unicode = resolve(font.get("ToUnicode"))
+        self.to_unicode = _parse_to_unicode(document.decode(to_unicode)) if isinstance(to_unicode, Stream) else {}
+        self.widths: Dict[int, float] = {}
+
+        if self.two_byte:
+            if not self.to_unicode:
+                raise PDFTextError("composite font without ToUnicode")
+            if resolve(font.get("Encoding")) not in ("Identity-H", "Identity-V"):
+                raise PDFTextError("unsupported composite font encoding")
+            descendants = resolve(font.get("DescendantFonts")) or [{}]
+            descendant = resolve(descendants[0]) or {}
+            self.default_width = resolve(descendant.get("DW", 1000))
+            self._load_cid_widths(resolve(descendant.get("W")) or [], resolve)
+            self.encoding = None
+            return
+
+        self.default_width = DEFAULT_GLYPH_WIDTH
+        first_char = resolve(font.get("FirstChar", 0))
+        for offset, width in enumerate(resolve(font.get("Widths")) or []):
+            self.widths[first_char + offset] = resolve(width)
+
+        encoding = resolve(font.get("Encoding"))
+        base = encoding.get("BaseEncoding") if isinstance(encoding, dict) else encoding
+        self.encoding = list(_MAC_ROMAN if base == "MacRomanEncoding" else _WIN_ANSI)
+        if isinstance(encoding, dict):
+            code = 0
+            for item in resolve(encoding.get("Differences")) or []:
+                if isinstance(item, int):
+                    code = item
+                elif isinstance(item, Name):
+                    if 0 <= code < 256:
+                        self.encoding[code] = _glyph_char(item, self.encoding[code])
+                    code += 1
+
+    def _load_cid_widths(self, w: List[Any], resolve) -> None:
+        index = 0
+        while index + 1 < len(w):
+            first = resolve(w[index])
+            following = resolve(w[index + 1])
+            if isinstance(following, list):
+                for offset, width in enumerate(following):
+                    self.widths[first + offset] = resolve(width)
+                index += 2
+            elif index + 2 < len(w):
+                width = resolve(w[index + 2])
+                for code in range(first, min(following, first + 0xFFFF) + 1):
+                    self.widths[code] = width
+                index += 3
+            else:
+                break
+
+    def codes(self, data: bytes) -> List[int]:
+        if self.two_byte:
+            return [int.from_bytes(data[i:i + 2], "big") for i in range(0, len(data) - 1, 2)]
+        return list(data)
+
+    def text(self, codes: List[int]) -> str:
+        if self.encoding is None:
+            return "".join(self.to_unicode.get(code, "\ufffd") for code in codes)
+        return "".join(self.to_unicode.get(code) or self.encoding[code] for code in codes)
+
+    def advance(self, codes: List[int]) -> float:
+        """Total glyph width in thousandths of an em"""
+        return sum(self.widths.get(code, self.default_width) for code in codes)
+
+
+# Content stream interpretation
+
+def _multiply(m: Tuple[float, ...], n: Tuple[float, ...]) -> Tuple[float, ...]:
+    a, b, c, d, e, f = m
+    A, B, C, D, E, F = n
+    return (a * A + b * C, a * B + b * D, c * A + d * C, c * B + d * D, e * A + f * C + E, e * B + f * D + F)
+
+
+def _matrix(operands: List[Any]) -> Tuple[float, ...]:
+    if len(operands) < 6:
+        raise ValueError("matrix needs six numbers")
+    return tuple(float(value) for value in operands[-6:])
+
+
+class _Interpreter:
+    """Runs the text-related operators of a page and collects positioned tokens"""
+
+    def __init__(self, document: PDFDocument):
+        self.document = document
+        self.fonts: Dict[int, _Font] = {}
+        self.tokens: List[Dict[str, Any]] = []
+        self.ctm = IDENTITY
+        self.tm = self.tlm = IDENTITY
+        self.font: Optional[_Font] = None
+        self.size = 0.0
+        self.char_spacing = self.word_spacing = self.leading = 0.0
+        self.scale = 1.0
+        self.stack: List[Tuple] = []
+
+    def _state(self) -> Tuple:
+        return (self.ctm, self.font, self.size, self.char_spacing, self.word_spacing, self.leading, self.scale)
+
+    def _restore(self, state: Tuple) -> None:
+        self.ctm, self.font, self.size, self.char_spacing, self.word_spacing, self.leading, self.scale = state
+
+    def _load_font(self, resources: Dict[str, Any], name: str) -> Optional[_Font]:
+        fonts = self.document.resolve(resources.get("Font")) or {}
+        font = self.document.resolve(fonts.get(name))
+        if not isinstance(font, dict):
+            return None
+        if id(font) not in self.fonts:
+            self.fonts[id(font)] = _Font(self.document, font)
+        return self.fonts[id(font)]
+
+    def _move(self, tx: float, ty: float) -> None:
+        self.tlm = _multiply((1.0, 0.0, 0.0, 1.0, tx, ty), self.tlm)
+        self.tm = self.tlm
+
+    def _show(self, items: List[Any]) -> None:
+        font = self.font
+        if font is None:
+            return
+        start = _multiply(self.tm, self.ctm)
+        parts = []
+        for item in items:
+            if isinstance(item, bytes):
+                codes = font.codes(item)
+                parts.append(font.text(codes))
+                spaces = 0 if font.two_byte else codes.count(32)
+                tx = (font.advance(codes) / 1000.0 * self.size + self.char_spacing * len(codes)
+                      + self.word_spacing * spaces) * self.scale
+            elif isinstance(item, (int, float)):
+                tx = -item / 1000.0 * self.size * self.scale
+                if item < -TJ_SPACE_THRESHOLD and parts and not parts[-1].endswith(" "):
+                    parts.append(" ")
+            else:
+                continue
+            a, b, c, d, e, f = self.tm
+            self.tm = (a, b, c, d, e + tx * a, f + tx * b)
+
+        text = "".join(parts)
+        if not text.strip():
+            return
+        end = _multiply(self.tm, self.ctm)
+        self.tokens.append({
+            "text": text,
+            "x": round(start[4], 2),
+            "y": round(start[5], 2),
+            "width": round(math.hypot(end[4] - start[4], end[5] - start[5]), 2),
+            "size": round(self.size * math.hypot(start[2], start[3]), 2),
+        })
+
+    def run(self, content: bytes, resources: Dict[str, Any], depth: int = 0) -> None:
+        operands: List[Any] = []
+        pos = 0
+        while True:
+            token, pos = _next_token(content, pos)
+            if token is None:
+                return
+            if not isinstance(token, Keyword) or token in ("<<", "[", "true", "false", "null"):
+                value, pos = _parse_object(content, pos, token, refs=False)
+                operands.append(value)
+                continue
+            try:
+                pos = self._operator(token, operands, content, pos, resources, depth)
+            except (IndexError, TypeError, ValueError, ZeroDivisionError):
+                pass  # malformed operator: ignore it like viewers do
+            operands = []
+
+    def _operator(self, op: str, operands: List[Any], content: bytes, pos: int,
+                  resources: Dict[str, Any], depth: int) -> int:
+        if op == "Tj":
+            self._show(operands[-1:])
+        elif op == "TJ":
+            self._show(operands[-1])
+        elif op == "Td":
+            self._move(float(operands[-2]), float(operands[-1]))
+        elif op == "TD":
+            self.leading = -float(operands[-1])
+            self._move(float(operands[-2]), float(operands[-1]))
+        elif op == "Tm":
+            self.tm = self.tlm = _matrix(operands)
+        elif op == "T*":
+            self._move(0.0, -self.leading)
+        elif op == "'":
+            self._move(0.0, -self.leading)
+            self._show(operands[-1:])
+        elif op == '"':
+            self.word_spacing, self.char_spacing = float(operands[-3]), float(operands[-2])
+            self._move(0.0, -self.leading)
+            self._show(operands[-1:])
+        elif op == "BT":
+            self.tm = self.tlm = IDENTITY
+        elif op == "Tf":
+            self.font = self._load_font(resources, operands[-2])
+            self.size = float(operands[-1])
+        elif op == "TL":
+            self.leading = float(operands[-1])
+        elif op == "Tc":
+            self.char_spacing = float(operands[-1])
+        elif op == "Tw":
+            self.word_spacing = float(operands[-1])
+        elif op == "Tz":
+            self.scale = float(operands[-1]) / 100.0
+        elif op == "q":
+            self.stack.append(self._state())
+        elif op == "Q":
+            if self.stack:
+                self._restore(self.stack.pop())
+        elif op == "cm":
+            self.ctm = _multiply(_matrix(operands), self.ctm)
+        elif op == "Do":
+            self._form_xobject(resources, operands[-1], depth)
+        elif op == "BI":
+            # Skip inline image data, which is binary
+            data_start = _INLINE_DATA.search(content, pos)
+            data_end = _INLINE_END.search(content, data_start.end()) if data_start else None
+            if data_end is None:
+                return len(content)
+            return data_end.end()
+        return pos
+
+    def _form_xobject(self, resources: Dict[str, Any], name: str, depth: int) -> None:
+        resolve = self.document.resolve
+        xobject = resolve((resolve(resources.get("XObject")) or {}).get(name))
+        if not isinstance(xobject, Stream) or xobject.attrs.get("Subtype") != "Form" or depth >= MAX_FORM_DEPTH:
+            return
+        saved = self._state(), self.tm, self.tlm
+        matrix = resolve(xobject.attrs.get("Matrix"))
+        if matrix:
+            self.ctm = _multiply(_matrix([resolve(value) for value in matrix]), self.ctm)
+        self.run(self.document.decode(xobject), resolve(xobject.attrs.get("Resources")) or resources, depth + 1)
+        state, self.tm, self.tlm = saved
+        self._restore(state)
+
+
+# Layout
+
+def tokens_to_text(tokens: List[Dict[str, Any]]) -> str:
+    """Group tokens into lines, top to bottom and left to right"""
+    lines: List[List[Any]] = []
+    for token in sorted(tokens, key=lambda t: (-t["y"], t["x"])):
+        if lines:
+            line_y, line_size, members = lines[-1]
+            if abs(line_y - token["y"]) <= 0.5 * max(1.0, min(line_size, token["size"])):
+                members.append(token)
+                continue
+        lines.append([token["y"], token["size"], [token]])
+
+    text_lines = []
+    for _, _, members in lines:
+        members.sort(key=lambda t: t["x"])
+        parts = [members[0]["text"]]
+        end = members[0]["x"] + members[0]["width"]
+        for token in members[1:]:
+            gap = token["x"] - end
+            if gap > 0.15 * max(1.0, token["size"]) and not parts[-1].endswith(" ") and not token["text"].startswith(" "):
+                parts.append(" ")
+            parts.append(token["text"])
+            end = max(end, token["x"] + token["width"])
+        text_lines.append("".join(parts).strip())
+    return "\n".join(text_lines)
+
+
+def _check_decoded(text: str) -> None:
+    """Fonts with custom encodings and no ToUnicode decode to control characters"""
+    if not text:
+        return
+    bad = sum(1 for char in text if char == "\ufffd" or (char < " " and char not in "\n\t"))
+    if bad / len(text) > MAX_BAD_CHAR_RATIO:
+        raise PDFTextError("text layer does not decode to readable text")
+
+
+class PDFTextReader:
+    """Page-by-page text layer of a PDF file"""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self.document = PDFDocument(f.read())
+        self._pages = self.document.pages()
+        self.page_count = len(self._pages)
+
+    def pages(self) -> Iterator[Tuple[str, List[Dict[str, Any]]]]:
+        """Yield (text, tokens) per page; tokens carry text, x, y, width and font size in points"""
+        for page, resources in self._pages:
+            interpreter = _Interpreter(self.document)
+            interpreter.run(self.document.page_content(page), resources)
+            text = tokens_to_text(interpreter.tokens)
+            _check_decoded(text)
+            yield text, interpreter.tokens
@@ -0,0 +1,87 @@
+"""Incremental W-2 classification, one page of text at a time.
+
+All W-2 and non-W-2 indicators are compiled into a single alternation, so each
+page is scanned once (and only until there is enough evidence) instead of once
+per keyword. The classifier decides as soon as the evidence allows it, and
+callers stop reading (or OCRing) pages once it rejects.
+"""
+import os
+import re
+from typing import Optional, Set
+
+ACCEPT = "accept"
+REJECT = "reject"
+UNDECIDED = "undecided"
+
+# Distinct W-2 indicators needed to accept a document
+W2_MIN_INDICATORS = 3
+# Documents up to this many pages are rejected once they show another form's
+# title with (almost) no W-2 evidence; longer ones may be mixed tax packets.
+W2_REJECT_MAX_PAGES = int(os.getenv("W2_REJECT_MAX_PAGES", "4"))
+# Reject any document whose first pages with text carry no W-2 indicator (0 disables)
+W2_REJECT_AFTER_PAGES = int(os.getenv("W2_REJECT_AFTER_PAGES", "3"))
+
+# W-2 indicators; "form w-2" also counts as "w-2"
+_POSITIVE = {
+    "wage and tax statement": ("wage and tax statement",),
+    "form w-2": ("form w-2", "w-2"),
+    "w-2": ("w-2",),
+    "employer identification number": ("employer identification number",),
+    "wages, tips, other compensation": ("wages, tips, other compensation",),
+    "federal income tax withheld": ("federal income tax withheld",),
+    "social security wages": ("social security wages",),
+    "medicare wages": ("medicare wages",),
+}
+
+# Titles of documents people upload by mistake
+_NEGATIVE = [
+    r"form 1099", r"1099-(?:nec|misc|int|div)", r"form 1098", r"form 1095",
+    r"receipt", r"invoice", r"driver'?s? licen[cs]e", r"passport", r"(?:bank|account) statement",
+]
+
+# One alternation over lowercased text. Branches start with literals (no groups
+# or anchors) so the regex engine can skip ahead to candidate characters.
+# Indicators match with single spaces, like the substring checks they replace.
+_MATCHER = re.compile("|".join(
+    [re.escape(indicator) for indicator in _POSITIVE] + _NEGATIVE
+))
+
+
+class W2Classifier:
+    """Feed page texts in order; `decision` is ACCEPT, REJECT or UNDECIDED"""
+
+    def __init__(self, page_count: Optional[int] = None):
+        self.page_count = page_count
+        self.reset()
+
+    def reset(self) -> None:
+        self.positives: Set[str] = set()
+        self.negatives: Set[str] = set()
+        self.pages_with_text = 0
+        self.decision = UNDECIDED
+
+    def feed(self, text: str) -> str:
+        if self.decision != UNDECIDED:
+            return self.decision
+
+        for match in _MATCHER.finditer(text.lower()):
+            found = match.group()
+            if found in _POSITIVE:
+                self.positives.update(_POSITIVE[found])
+                if len(self.positives) >= W2_MIN_INDICATORS:
+                    break
+            else:
+                self.negatives.add(found)
+        if text.strip():
+            self.pages_with_text += 1
+
+        if len(self.positives) >= W2_MIN_INDICATORS:
+            self.decision = ACCEPT
+        elif self.negatives and len(self.positives) < 2 and (self.page_count or 1) <= W2_REJECT_MAX_PAGES:
+            self.decision = REJECT
+        elif not self.positives and W2_REJECT_AFTER_PAGES and self.pages_with_text >= W2_REJECT_AFTER_PAGES:
+            self.decision = REJECT
+        return self.decision
+
+    def is_w2(self) -> bool:
+        return self.decision == ACCEPT
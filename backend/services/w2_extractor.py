@@ -1,18 +1,35 @@
-import pytesseract
-import pdfplumber
-from pdf2image import convert_from_path
-from PIL import Image
 import re
 import os
 import logging
-from typing import Dict, Any, Optional, Tuple
-import cv2
-import numpy as np
+import tempfile
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Callable, Iterable, List, Optional, Tuple
+
+from metrics import (
+    timed_stage, collect_stage_timings, EXTRACTION_PAGES_TOTAL, EXTRACTION_BYTES_TOTAL
+)
+from services.pdf_text import PDFTextReader
+from services.w2_classifier import W2Classifier, ACCEPT, REJECT
 
 logger = logging.getLogger(__name__)
 
+# The OCR stack (cv2, numpy, pytesseract, pdfplumber, pdf2image) is imported
+# inside the methods that use it so importing this module stays cheap.
+
+# Threads used for per-page OCR (Tesseract releases the GIL)
+EXTRACTION_WORKERS = int(os.getenv("W2_EXTRACTION_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+# "fast": read text-layer PDFs with services.pdf_text, falling back to pdfplumber
+# when it cannot decode a file. "pdfplumber": always use pdfplumber.
+PDF_TEXT_ENGINE = os.getenv("PDF_TEXT_ENGINE", "fast")
+
+# Box a label; each copy of a W-2 (B, C, 2, ...) starts with it
+COPY_START_PATTERN = re.compile(r"^.*employee'?s\s+social\s+security\s+number", re.IGNORECASE | re.MULTILINE)
+
 class W2Extractor:
-    def __init__(self):
+    def __init__(self, max_workers: int = EXTRACTION_WORKERS):
+        self.max_workers = max(1, max_workers)
         self.w2_patterns = {
             'employer_name': [
                 r'(?:Employer|Company).*?([A-Z][A-Za-z\s&.,]+)',
@@ -55,22 +72,27 @@ class W2Extractor:
     def preprocess_image(self, image_path: str) -> str:
         """Preprocess image for better OCR results"""
         try:
+            import cv2
+            import numpy as np
+
             # Read image
-            img = cv2.imread(image_path)
+            with timed_stage('decode'):
+                img = cv2.imread(image_path)
 
-            # Convert to grayscale
-            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+            with timed_stage('preprocess'):
+                # Convert to grayscale
+                gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
 
-            # Apply threshold to get image with only black and white
-            _, thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+                # Apply threshold to get image with only black and white
+                _, thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
 
-            # Noise removal
-            kernel = np.ones((1, 1), np.uint8)
-            opening = cv2.morphologyEx(thresh, cv2.MORPH_OPENING, kernel, iterations=1)
+                # Noise removal
+                kernel = np.ones((1, 1), np.uint8)
+                opening = cv2.morphologyEx(thresh, cv2.MORPH_OPENING, kernel, iterations=1)
 
-            # Save preprocessed image temporarily
-            temp_path = image_path.replace('.', '_processed.')
-            cv2.imwrite(temp_path, opening)
+                # Save preprocessed image temporarily
+                temp_path = image_path.replace('.', '_processed.')
+                cv2.imwrite(temp_path, opening)
 
             return temp_path
         except Exception as e:
@@ -80,6 +102,8 @@ class W2Extractor:
     def extract_text_from_image(self, image_path: str) -> Tuple[str, float]:
         """Extract text from image using OCR"""
         try:
+            import pytesseract
+
             # Preprocess image
             processed_path = self.preprocess_image(image_path)
 
@@ -87,8 +111,9 @@ class W2Extractor:
             custom_config = r'--oem 3 --psm 6'
 
             # Extract text with confidence
-            data = pytesseract.image_to_data(processed_path, config=custom_config, output_type=pytesseract.Output.DICT)
-            text = pytesseract.image_to_string(processed_path, config=custom_config)
+            with timed_stage('ocr'):
+                data = pytesseract.image_to_data(processed_path, config=custom_config, output_type=pytesseract.Output.DICT)
+                text = pytesseract.image_to_string(processed_path, config=custom_config)
 
             # Calculate average confidence
             confidences = [int(conf) for conf in data['conf'] if int(conf) > 0]
@@ -105,59 +130,110 @@ class W2Extractor:
 
     def extract_text_from_pdf(self, pdf_path: str) -> Tuple[str, float]:
         """Extract text from PDF"""
+        pages, confidences = self.extract_pages_from_pdf(pdf_path)
+        confidence = sum(confidences) / len(confidences) if confidences else 0.0
+        return "\n".join(pages), confidence
+
+    def extract_pages_from_pdf(self, pdf_path: str) -> Tuple[List[str], List[float]]:
+        """Extract text per page from PDF, with a confidence per page"""
+        pdf = self.read_pdf(pdf_path)
+        return pdf['pages'], pdf['confidences']
+
+    def read_text_layer(self, pdf_path: str, classifier: W2Classifier) -> Optional[Dict[str, Any]]:
+        """Read the text layer with the lightweight reader.
+
+        Stops after a page the classifier rejects; accepted documents are read
+        in full, since any later page may hold another employee's W-2.
+        Returns None when the reader cannot handle the file (pdfplumber
+        should be used instead).
+        """
         try:
-            text = ""
-            confidence = 0.8  # PDFs generally have good text extraction
-
-            # Try direct text extraction first
-            with pdfplumber.open(pdf_path) as pdf:
-                for page in pdf.pages:
-                    page_text = page.extract_text()
-                    if page_text:
-                        text += page_text + "\n"
-
-            # If no text found, convert to images and use OCR
-            if not text.strip():
-                images = convert_from_path(pdf_path)
-                total_confidence = 0
-                page_count = 0
-
-                for i, image in enumerate(images):
-                    temp_image_path = f"/tmp/temp_page_{i}.png"
-                    image.save(temp_image_path, 'PNG')
-
-                    page_text, page_conf = self.extract_text_from_image(temp_image_path)
-                    text += page_text + "\n"
-                    total_confidence += page_conf
-                    page_count += 1
-
-                    # Clean up temp file
-                    if os.path.exists(temp_image_path):
-                        os.remove(temp_image_path)
-
-                confidence = total_confidence / page_count if page_count > 0 else 0.0
-
-            return text, confidence
+            reader = PDFTextReader(pdf_path)
+            classifier.page_count = reader.page_count
+            pages, tokens = [], []
+            for page_text, page_tokens in reader.pages():
+                pages.append(page_text)
+                tokens.append(page_tokens)
+                if self._classify(classifier, page_text) == REJECT:
+                    break
+        except Exception as e:
+            logger.info(f"Falling back to pdfplumber for {pdf_path}: {e}")
+            classifier.reset()
+            return None
+        return {'pages': pages, 'tokens': tokens, 'page_count': reader.page_count}
+
+    def _classify(self, classifier: W2Classifier, text: str) -> str:
+        with timed_stage('classification'):
+            return classifier.feed(text)
+
+    def read_pdf(self, pdf_path: str, classifier: Optional[W2Classifier] = None) -> Dict[str, Any]:
+        """Text per page of a PDF: {'pages', 'confidences', 'tokens', 'page_count'}.
+
+        Pages are fed to `classifier` as they are read; once it rejects the
+        document the remaining pages are skipped. `tokens` holds positioned
+        text-layer tokens per page read, or is empty when the text came from
+        pdfplumber or OCR. `pages` is shorter than `page_count` after a
+        rejection.
+        """
+        classifier = classifier or W2Classifier()
+        try:
+            layer = None
+            if PDF_TEXT_ENGINE == "fast":
+                with timed_stage('text_layer'):
+                    layer = self.read_text_layer(pdf_path, classifier)
+
+            if layer is not None:
+                pages, tokens, page_count = layer['pages'], layer['tokens'], layer['page_count']
+            else:
+                import pdfplumber
+
+                pages, tokens = [], []
+                with timed_stage('text_layer'), pdfplumber.open(pdf_path) as pdf:
+                    page_count = classifier.page_count = len(pdf.pages)
+                    for page in pdf.pages:
+                        pages.append(page.extract_text() or "")
+                        if self._classify(classifier, pages[-1]) == REJECT:
+                            break
+
+            if any(page_text.strip() for page_text in pages):
+                # PDFs generally have good text extraction
+                return {'pages': pages, 'confidences': [0.8] * len(pages), 'tokens': tokens, 'page_count': page_count}
+
+            # If no text found, OCR page one as a probe, then the rest in parallel
+            classifier.reset()
+            results = [self._ocr_pdf_page(pdf_path, 1)] if page_count else []
+            if results and self._classify(classifier, results[0][0]) != REJECT:
+                results += self._parallel_map(lambda n: self._ocr_pdf_page(pdf_path, n), range(2, page_count + 1))
+                for text, _ in results[1:]:
+                    self._classify(classifier, text)
+
+            return {'pages': [text for text, _ in results], 'confidences': [conf for _, conf in results],
+                    'tokens': [], 'page_count': page_count}
         except Exception as e:
             logger.error(f"Error extracting text from PDF: {e}")
-            return "", 0.0
+            return {'pages': [], 'confidences': [], 'tokens': [], 'page_count': 0}
+
+    def _ocr_pdf_page(self, pdf_path: str, page_number: int) -> Tuple[str, float]:
+        """Rasterize a single PDF page and OCR it"""
+        from pdf2image import convert_from_path
+
+        fd, temp_image_path = tempfile.mkstemp(suffix=".png")
+        os.close(fd)
+        try:
+            with timed_stage('decode'):
+                images = convert_from_path(pdf_path, first_page=page_number, last_page=page_number)
+                if not images:
+                    return "", 0.0
+                images[0].save(temp_image_path, 'PNG')
+            return self.extract_text_from_image(temp_image_path)
+        finally:
+            # Clean up temp file
+            if os.path.exists(temp_image_path):
+                os.remove(temp_image_path)
 
     def is_w2_document(self, text: str) -> bool:
         """Check if the document is likely a W2 form"""
-        w2_indicators = [
-            "wage and tax statement",
-            "form w-2",
-            "w-2",
-            "employer identification number",
-            "wages, tips, other compensation",
-            "federal income tax withheld",
-            "social security wages",
-            "medicare wages"
-        ]
-
-        text_lower = text.lower()
-        matches = sum(1 for indicator in w2_indicators if indicator in text_lower)
-        return matches >= 3  # Require at least 3 indicators
+        return W2Classifier().feed(text) == ACCEPT  # Requires at least 3 W-2 indicators
 
     def extract_w2_fields(self, text: str) -> Dict[str, Any]:
         """Extract W2 fields from text using regex patterns"""
@@ -189,16 +265,106 @@ class W2Extractor:
 
         return extracted_fields
 
+    def _parallel_map(self, func: Callable, items: Iterable) -> List:
+        """Map over a thread pool, carrying the caller's context (stage timings) into each task"""
+        items = list(items)
+        contexts = [contextvars.copy_context() for _ in items]
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return list(executor.map(lambda ctx, item: ctx.run(func, item), contexts, items))
+
+    def segment_w2_forms(self, pages: List[str]) -> List[Dict[str, Any]]:
+        """Split page texts into one segment per W-2 copy.
+
+        Pages that do not look like a W-2 (instructions, cover sheets) are
+        skipped. A page with several copies is split on the box a label.
+        """
+        segments = []
+        for page_number, page_text in enumerate(pages, start=1):
+            if not self.is_w2_document(page_text):
+                if page_text.strip():
+                    logger.info(f"Skipping page {page_number}: too few W-2 indicators")
+                continue
+
+            starts = [match.start() for match in COPY_START_PATTERN.finditer(page_text)]
+            if len(starts) <= 1:
+                segments.append({'page': page_number, 'text': page_text})
+                continue
+
+            # Text before the first copy (page headers) belongs to the first copy
+            starts[0] = 0
+            for start, end in zip(starts, starts[1:] + [len(page_text)]):
+                segments.append({'page': page_number, 'text': page_text[start:end]})
+
+        return segments
+
+    def _form_key(self, fields: Dict[str, Any]) -> Tuple:
+        """Identity used to collapse duplicate copies of the same W-2"""
+        if fields.get('employee_ssn') or fields.get('employer_ein'):
+            return (fields.get('employee_ssn'), fields.get('employer_ein'),
+                    fields.get('wages_tips_compensation'))
+        return tuple(sorted(fields.items()))
+
+    def extract_w2_forms(self, pages: List[str], confidences: List[float]) -> List[Dict[str, Any]]:
+        """Extract one record per distinct W-2 found in the pages"""
+        segments = self.segment_w2_forms(pages)
+        if not segments:
+            return []
+
+        # Regex parsing holds the GIL, so a thread pool would not speed it up
+        fields_per_segment = [self.extract_w2_fields(segment['text']) for segment in segments]
+
+        forms = []
+        forms_by_key = {}
+        for segment, fields in zip(segments, fields_per_segment):
+            # A segment carrying nothing but a year is not a form
+            if not any(name != 'tax_year' for name in fields):
+                logger.info(f"Dropping a segment on page {segment['page']}: no W-2 fields besides the year")
+                continue
+
+            key = self._form_key(fields)
+            existing = forms_by_key.get(key)
+            if existing:
+                # Duplicate copy (B/C/2): keep the most complete one
+                existing['pages'].append(segment['page'])
+                if len(fields) > len(existing['extracted_fields']):
+                    existing.update(page=segment['page'], text=segment['text'], extracted_fields=fields)
+                continue
+
+            form = {
+                'page': segment['page'],
+                'pages': [segment['page']],
+                'text': segment['text'],
+                'extracted_fields': fields,
+                'confidence': confidences[segment['page'] - 1] if confidences else 0.0,
+            }
+            forms_by_key[key] = form
+            forms.append(form)
+
+        return forms
+
     def process_document(self, file_path: str) -> Dict[str, Any]:
         """Process any document and extract W2 data if it's a W2 form"""
+        with collect_stage_timings() as timings:
+            result = self._process_document(file_path)
+        result['timings'] = timings
+        return result
+
+    def _process_document(self, file_path: str) -> Dict[str, Any]:
         try:
             file_ext = os.path.splitext(file_path)[1].lower()
+            # Classifies pages as they are read so non-W-2s stop early
+            classifier = W2Classifier()
 
             # Extract text based on file type
             if file_ext in ['.jpg', '.jpeg', '.png', '.tiff', '.bmp']:
                 text, confidence = self.extract_text_from_image(file_path)
+                pages, confidences, tokens, page_count = [text], [confidence], [], 1
+                self._classify(classifier, text)
             elif file_ext == '.pdf':
-                text, confidence = self.extract_text_from_pdf(file_path)
+                pdf = self.read_pdf(file_path, classifier)
+                pages, confidences, tokens, page_count = pdf['pages'], pdf['confidences'], pdf['tokens'], pdf['page_count']
+                text = "\n".join(pages)
+                confidence = sum(confidences) / len(confidences) if confidences else 0.0
             else:
                 return {
                     'is_w2': False,
@@ -206,20 +372,39 @@ class W2Extractor:
                     'confidence': 0.0
                 }
 
+            EXTRACTION_PAGES_TOTAL.inc(amount=len(pages))
+            EXTRACTION_BYTES_TOTAL.inc(amount=os.path.getsize(file_path))
+
             # Check if it's a W2 document
-            is_w2 = self.is_w2_document(text)
+            is_w2 = classifier.is_w2()
 
             result = {
                 'is_w2': is_w2,
                 'confidence': confidence,
                 'raw_text': text,
                 'extracted_fields': {},
+                'forms': [],
+                'page_count': page_count,
+                'pages_read': len(pages),
+                'tokens': tokens,
                 'error': None
             }
 
-            # If it's a W2, extract fields
+            # If it's a W2, extract one set of fields per distinct form
             if is_w2:
-                result['extracted_fields'] = self.extract_w2_fields(text)
+                with timed_stage('field_parse'):
+                    forms = self.extract_w2_forms(pages, confidences)
+                    if not forms:
+                        # No per-page boundaries found; treat the document as one form
+                        forms = [{
+                            'page': 1,
+                            'pages': list(range(1, len(pages) + 1)),
+                            'text': text,
+                            'extracted_fields': self.extract_w2_fields(text),
+                            'confidence': confidence,
+                        }]
+                result['forms'] = forms
+                result['extracted_fields'] = forms[0]['extracted_fields']
 
             return result
 
@@ -230,5 +415,6 @@ class W2Extractor:
                 'error': str(e),
                 'confidence': 0.0,
                 'raw_text': '',
-                'extracted_fields': {}
+                'extracted_fields': {},
+                'forms': []
             }
@@ -0,0 +1,76 @@
+"""Reclaimed documents are retried a bounded number of times and persisted once."""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import extraction
+from models import Base, Document, W2Form
+
+W2_RESULT = {
+    'is_w2': True,
+    'forms': [{'page': 1, 'pages': [1], 'confidence': 90.0, 'text': 'Form W-2',
+               'extracted_fields': {'employee_ssn': '123-45-6789'}}],
+}
+
+
+@pytest.fixture
+def Session(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'extraction.db'}")
+    Base.metadata.create_all(engine)
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def _add_document(Session, **fields) -> int:
+    with Session() as db:
+        document = Document(user_id=1, filename="w2.pdf", file_path="w2.pdf", file_type=".pdf", **fields)
+        db.add(document)
+        db.commit()
+        return document.id
+
+
+class _Extractor:
+    def __init__(self, process):
+        self.process_document = process
+
+
+def test_stale_documents_fail_after_max_attempts(Session):
+    stale = datetime.utcnow() - timedelta(seconds=extraction.EXTRACTION_LEASE_SECONDS + 60)
+    exhausted = _add_document(Session, extraction_status="processing", claimed_at=stale,
+                              extraction_attempts=extraction.EXTRACTION_MAX_ATTEMPTS)
+    retried = _add_document(Session, extraction_status="processing", claimed_at=stale, extraction_attempts=1)
+
+    with Session() as db:
+        assert extraction.claim_pending_documents(db, 10) == [(retried, "w2.pdf")]
+        assert db.get(Document, exhausted).extraction_status == "failed"
+        assert db.get(Document, retried).extraction_status == "processing"
+
+
+def test_each_extraction_counts_an_attempt(Session, monkeypatch):
+    document_id = _add_document(Session, extraction_status="pending")
+    monkeypatch.setattr(extraction, "_extractor", _Extractor(lambda path: W2_RESULT))
+
+    with Session() as db:
+        assert extraction.extract_document(document_id, "w2.pdf", db) == "completed"
+        document = db.get(Document, document_id)
+        assert document.extraction_attempts == 1
+        assert db.query(W2Form).filter(W2Form.document_id == document_id).count() == 1
+
+
+def test_results_of_a_reclaimed_document_are_discarded(Session, monkeypatch):
+    document_id = _add_document(Session, extraction_status="pending")
+
+    def process(path):
+        # Another worker takes the document over while this one is still extracting
+        with Session() as other:
+            other.get(Document, document_id).claimed_at = datetime.utcnow() + timedelta(seconds=1)
+            other.commit()
+        return W2_RESULT
+
+    monkeypatch.setattr(extraction, "_extractor", _Extractor(process))
+
+    with Session() as db:
+        assert extraction.extract_document(document_id, "w2.pdf", db) == "discarded"
+        assert db.get(Document, document_id).extraction_status == "processing"
+        assert db.query(W2Form).filter(W2Form.document_id == document_id).count() == 0
@@ -0,0 +1,35 @@
+"""The load-test gate compares medians of repeated runs and ignores thin samples."""
+from benchmarks.load_test import combine_reports, find_regressions
+
+
+def _report(throughput=100.0, **endpoints):
+    return {"throughput_rps": throughput, "wall_seconds": 1.0, "mix": "default", "endpoints": endpoints}
+
+
+def _stats(count=200, p95=100.0, p99=150.0, errors=0):
+    return {"count": count, "p50": 50.0, "p95": p95, "p99": p99, "mean": 60.0, "max": 300.0,
+            "errors": errors, "throughput_rps": 10.0}
+
+
+def test_combine_reports_takes_medians_across_runs():
+    runs = [_report(90.0, a=_stats(p95=100.0)), _report(200.0, a=_stats(p95=400.0)), _report(110.0, a=_stats(p95=120.0))]
+    combined = combine_reports(runs)
+    assert combined["runs"] == 3
+    assert combined["throughput_rps"] == 110.0
+    assert combined["endpoints"]["a"]["p95"] == 120.0
+
+
+def test_p95_regression_is_gated():
+    regressions = find_regressions(_report(a=_stats(p95=200.0)), _report(a=_stats(p95=100.0)), 0.25)
+    assert regressions == ["a p95 100.0ms -> 200.0ms"]
+
+
+def test_thin_samples_and_p99_are_not_gated():
+    baseline = _report(a=_stats(count=20, p95=100.0), b=_stats(p99=100.0))
+    current = _report(a=_stats(count=20, p95=300.0), b=_stats(p99=500.0))
+    assert find_regressions(current, baseline, 0.25, min_samples=50) == []
+
+
+def test_new_errors_and_throughput_drops_are_gated():
+    regressions = find_regressions(_report(50.0, a=_stats(count=5, errors=2)), _report(100.0, a=_stats(count=5)), 0.25)
+    assert regressions == ["a started failing (2 errors)", "throughput 100.0 -> 50.0 req/s"]
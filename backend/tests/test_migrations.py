@@ -0,0 +1,37 @@
+"""Databases created by earlier releases get the columns added since."""
+from sqlalchemy import create_engine, inspect, text
+
+import migrations
+from models import Base
+
+
+def _columns(engine, table):
+    return {column["name"] for column in inspect(engine).get_columns(table)}
+
+
+def test_adds_new_columns_to_tables_from_older_releases(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as conn:
+        # documents and w2_forms as the first release created them
+        conn.execute(text(
+            "CREATE TABLE documents (id INTEGER PRIMARY KEY, user_id INTEGER, filename VARCHAR, "
+            "file_path VARCHAR, file_type VARCHAR, uploaded_at DATETIME, processed BOOLEAN, "
+            "extraction_status VARCHAR)"))
+        conn.execute(text("CREATE TABLE w2_forms (id INTEGER PRIMARY KEY, user_id INTEGER, document_id INTEGER)"))
+        conn.execute(text("INSERT INTO documents (id, user_id, extraction_status) VALUES (1, 1, 'completed')"))
+
+    added = migrations.add_missing_columns(engine, Base.metadata)
+
+    assert {"documents.batch_id", "documents.claimed_at", "w2_forms.page_number"} <= set(added)
+    assert _columns(engine, "documents") == set(Base.metadata.tables["documents"].columns.keys())
+    assert "ix_documents_batch_id" in {index["name"] for index in inspect(engine).get_indexes("documents")}
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT extraction_status, batch_id FROM documents")).one() == ("completed", None)
+
+    # Idempotent: a second start adds nothing
+    assert migrations.add_missing_columns(engine, Base.metadata) == []
+
+
+def test_ignores_missing_tables(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'empty.db'}")
+    assert migrations.add_missing_columns(engine, Base.metadata) == []
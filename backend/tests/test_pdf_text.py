@@ -0,0 +1,209 @@
+"""The lightweight text-layer reader must read the same text as pdfplumber.
+
+Each fixture is built here byte by byte so it exercises one PDF feature the
+reader implements: compressed content, object/xref streams with PNG
+predictors, composite (Type0) fonts, /Differences encodings and form XObjects.
+"""
+import zlib
+from pathlib import Path
+from typing import List
+
+import pytest
+
+from services.pdf_text import PDFDocument, PDFTextReader, Stream
+
+pdfplumber = pytest.importorskip("pdfplumber")
+
+HELVETICA_WIDTHS = "/FirstChar 32 /LastChar 126 /Widths [" + " ".join(["556"] * 95) + "]"
+HELVETICA = "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding " + HELVETICA_WIDTHS + " >>"
+
+
+def _stream(attrs: str, data: bytes) -> bytes:
+    return b"<< %s /Length %d >>\nstream\n" % (attrs.encode(), len(data)) + data + b"\nendstream"
+
+
+def _flate(attrs: str, data: bytes) -> bytes:
+    return _stream("/Filter /FlateDecode " + attrs, zlib.compress(data))
+
+
+def _png_up(data: bytes, columns: int) -> bytes:
+    """PNG "Up" predictor rows, as written for /Predictor 12"""
+    rows = [data[i:i + columns].ljust(columns, b" ") for i in range(0, len(data), columns)]
+    previous = bytes(columns)
+    output = bytearray()
+    for row in rows:
+        output += b"\x02" + bytes((value - above) & 0xFF for value, above in zip(row, previous))
+        previous = row
+    return bytes(output)
+
+
+def _page(resources: str, content_id: int) -> bytes:
+    return (f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources {resources} /Contents {content_id} 0 R >>").encode()
+
+
+def _write_pdf(path: Path, objects: List[bytes]) -> Path:
+    """Objects are numbered from 1; object 1 is the catalog, 2 the page tree"""
+    output = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(output))
+        output += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref_offset = len(output)
+    output += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        output += b"%010d 00000 n \n" % offset
+    output += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref_offset)
+    path.write_bytes(bytes(output))
+    return path
+
+
+def _single_page(path: Path, resources: str, content: bytes, *extra: bytes) -> Path:
+    return _write_pdf(path, [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        _page(resources, 4),
+        _flate("", content),
+        *extra,
+    ])
+
+
+def flate_content(tmp_path: Path) -> Path:
+    content = b"""BT /F1 10 Tf 14 TL 50 740 Td
+(Form W-2 Wage and Tax Statement) Tj T*
+(Employer identification number 12-3456789) Tj T*
+[(Wages, tips) -600 (other compensation)] TJ
+0 -28 Td (1) Tj 300 0 Td (52,000.00) Tj
+ET"""
+    return _single_page(tmp_path / "flate.pdf", "<< /Font << /F1 5 0 R >> >>", content, HELVETICA.encode())
+
+
+def object_and_xref_streams(tmp_path: Path) -> Path:
+    content = b"BT /F1 11 Tf 72 700 Td (Federal income tax withheld) Tj 0 -20 Td (6,240.00) Tj ET"
+    contained = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        _page("<< /Font << /F1 4 0 R >> >>", 5),
+        HELVETICA.encode(),
+    ]
+    header, body = [], bytearray()
+    for number, obj in enumerate(contained, start=1):
+        header.append(b"%d %d" % (number, len(body)))
+        body += obj + b"\n"
+    header_bytes = b" ".join(header) + b"\n"
+    object_stream = _stream(
+        f"/Type /ObjStm /N {len(contained)} /First {len(header_bytes)} /Filter /FlateDecode "
+        "/DecodeParms << /Predictor 12 /Columns 16 >>",
+        zlib.compress(_png_up(header_bytes + bytes(body), 16)),
+    )
+
+    output = bytearray(b"%PDF-1.5\n%\xe2\xe3\xcf\xd3\n")
+    offsets = {}
+    for number, obj in ((5, _flate("", content)), (6, object_stream)):
+        offsets[number] = len(output)
+        output += b"%d 0 obj\n" % number + obj + b"\nendobj\n"
+
+    # Cross-reference stream: type, offset or object stream number, generation or index
+    entries = [b"\x00\x00\x00\xff"]
+    entries += [bytes([2, 0, 6, index]) for index in range(len(contained))]
+    entries += [bytes([1]) + offsets[number].to_bytes(2, "big") + b"\x00" for number in (5, 6)]
+    entries.append(bytes([1]) + len(output).to_bytes(2, "big") + b"\x00")
+    xref_offset = len(output)
+    output += b"7 0 obj\n" + _stream(
+        "/Type /XRef /Size 8 /W [1 2 1] /Root 1 0 R /Filter /FlateDecode "
+        "/DecodeParms << /Predictor 12 /Columns 4 >>",
+        zlib.compress(_png_up(b"".join(entries), 4)),
+    ) + b"\nendobj\n"
+    output += b"startxref\n%d\n%%%%EOF\n" % xref_offset
+
+    path = tmp_path / "objstm.pdf"
+    path.write_bytes(bytes(output))
+    return path
+
+
+def type0_identity_h(tmp_path: Path) -> Path:
+    text = "Medicare wages 48,500.00"
+    chars = sorted(set(text))
+    cids = {char: index + 1 for index, char in enumerate(chars)}
+    to_unicode = b"""/CIDInit /ProcSet findresource begin 12 dict begin begincmap
+/CMapName /Adobe-Identity-UCS def /CMapType 2 def
+1 begincodespacerange <0000> <FFFF> endcodespacerange
+%d beginbfchar
+%s
+endbfchar
+endcmap CMapName currentdict /CMap defineresource pop end end""" % (
+        len(chars), b"\n".join(b"<%04X> <%04X>" % (cids[char], ord(char)) for char in chars))
+    shown = "".join(f"{cids[char]:04X}" for char in text).encode()
+    content = b"BT /F1 12 Tf 60 650 Td <" + shown + b"> Tj 0 -24 Td <" + shown[:28] + b"> Tj ET"
+    widths = " ".join("500" if char != " " else "250" for char in chars)
+    return _single_page(
+        tmp_path / "type0.pdf", "<< /Font << /F1 5 0 R >> >>", content,
+        b"<< /Type /Font /Subtype /Type0 /BaseFont /ArialMT /Encoding /Identity-H "
+        b"/DescendantFonts [6 0 R] /ToUnicode 8 0 R >>",
+        f"<< /Type /Font /Subtype /CIDFontType2 /BaseFont /ArialMT "
+        f"/CIDSystemInfo << /Registry (Adobe) /Ordering (Identity) /Supplement 0 >> "
+        f"/FontDescriptor 7 0 R /DW 1000 /W [1 [{widths}]] >>".encode(),
+        b"<< /Type /FontDescriptor /FontName /ArialMT /Flags 32 /FontBBox [-665 -325 2000 1040] "
+        b"/ItalicAngle 0 /Ascent 905 /Descent -212 /CapHeight 716 /StemV 80 >>",
+        _flate("", to_unicode),
+    )
+
+
+def differences_encoding(tmp_path: Path) -> Path:
+    # Codes 1-9 spell "Form W-2" through glyph names; 65 ("A") is remapped to "1"
+    content = b"BT /F1 10 Tf 50 700 Td (\x01\x02\x03\x04\x05\x06\x07\x08) Tj 0 -16 Td (Box A: AA) Tj ET"
+    differences = "[1 /F /o /r /m /space /W /hyphen /two 65 /one]"
+    widths = " ".join(["600"] * 126)
+    return _single_page(
+        tmp_path / "differences.pdf", "<< /Font << /F1 5 0 R >> >>", content,
+        (f"<< /Type /Font /Subtype /Type1 /BaseFont /Courier /FirstChar 1 /LastChar 126 /Widths [{widths}] "
+         f"/Encoding << /Type /Encoding /BaseEncoding /WinAnsiEncoding /Differences {differences} >> >>").encode(),
+    )
+
+
+def form_xobject(tmp_path: Path) -> Path:
+    content = b"""BT /F1 10 Tf 50 740 Td (Copy B - To Be Filed With Employee's FEDERAL Tax Return) Tj ET
+q 1 0 0 1 50 600 cm /Fm1 Do Q
+q /Fm1 Do Q"""
+    form = b"""BT /F2 10 Tf 0 40 Td (Social security wages) Tj 200 0 Td (48,500.00) Tj ET
+/Fm2 Do
+"""
+    nested = b"BT /F2 8 Tf 0 10 Td (Nested form text) Tj ET"
+    return _single_page(
+        tmp_path / "form.pdf", "<< /Font << /F1 5 0 R >> /XObject << /Fm1 6 0 R >> >>", content,
+        HELVETICA.encode(),
+        _flate("/Type /XObject /Subtype /Form /BBox [0 0 400 100] /Matrix [1 0 0 1 0 20] "
+               "/Resources << /Font << /F2 5 0 R >> /XObject << /Fm2 7 0 R >> >>", form),
+        _flate("/Type /XObject /Subtype /Form /BBox [0 0 400 50] /Resources << /Font << /F2 5 0 R >> >>", nested),
+    )
+
+
+FIXTURES = {
+    "flate_content": (flate_content, "Wage and Tax Statement"),
+    "object_and_xref_streams": (object_and_xref_streams, "Federal income tax withheld"),
+    "type0_identity_h": (type0_identity_h, "Medicare wages 48,500.00"),
+    "differences_encoding": (differences_encoding, "Form W-2"),
+    "form_xobject": (form_xobject, "Nested form text"),
+}
+
+
+@pytest.mark.parametrize("name", sorted(FIXTURES))
+def test_text_matches_pdfplumber(tmp_path, name):
+    build, expected = FIXTURES[name]
+    path = build(tmp_path)
+
+    reader = PDFTextReader(str(path))
+    fast = [text for text, _ in reader.pages()]
+    with pdfplumber.open(str(path)) as pdf:
+        reference = [page.extract_text() or "" for page in pdf.pages]
+
+    assert reader.page_count == len(reference)
+    assert fast == reference
+    assert expected in fast[0]
+
+
+def test_png_predictor_rows():
+    data = bytes(range(40))
+    stream = Stream({"Filter": "FlateDecode", "DecodeParms": {"Predictor": 12, "Columns": 8}},
+                    zlib.compress(_png_up(data, 8)))
+    assert PDFDocument(b"").decode(stream) == data
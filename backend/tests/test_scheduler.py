@@ -0,0 +1,31 @@
+"""Extraction job pricing reads the page tree, including compressed object streams."""
+import pytest
+
+from scheduler import SCANNED_PDF_PAGE_COST, TEXT_PDF_PAGE_COST, estimate_cost
+from test_pdf_text import flate_content, form_xobject, object_and_xref_streams
+
+pytest.importorskip("PIL")
+from benchmarks.w2_corpus import write_scanned_pdf, write_text_pdf  # noqa: E402
+
+
+@pytest.mark.parametrize("build", [flate_content, object_and_xref_streams, form_xobject])
+def test_text_layer_pdfs_are_priced_as_text(tmp_path, build):
+    assert estimate_cost(str(build(tmp_path)), ".pdf") == (TEXT_PDF_PAGE_COST, 1)
+
+
+def test_pages_are_counted_from_the_page_tree(tmp_path):
+    write_text_pdf(tmp_path / "packet.pdf", [["Form W-2"], ["Form W-2"], ["Instructions"]])
+    cost, pages = estimate_cost(str(tmp_path / "packet.pdf"), ".pdf")
+    assert pages == 3
+    assert cost == pytest.approx(3 * TEXT_PDF_PAGE_COST)
+
+
+def test_scanned_pages_are_priced_as_ocr(tmp_path):
+    write_scanned_pdf(tmp_path / "scan.pdf", [["Form W-2"], ["Copy C"]], dpi=50)
+    assert estimate_cost(str(tmp_path / "scan.pdf"), ".pdf") == (2 * SCANNED_PDF_PAGE_COST, 2)
+
+
+def test_unparseable_pdfs_fall_back_to_a_byte_scan(tmp_path):
+    path = tmp_path / "broken.pdf"
+    path.write_bytes(b"%PDF-1.4 /Type /Page /Type /Page no catalog")
+    assert estimate_cost(str(path), ".pdf") == (2 * SCANNED_PDF_PAGE_COST, 2)
@@ -0,0 +1,13 @@
+"""API workers must start without importing the OCR stack."""
+import json
+import subprocess
+import sys
+
+from benchmarks.startup import BACKEND_DIR, OCR_MODULES, PROBE
+
+
+def test_import_main_does_not_load_ocr_modules(tmp_path):
+    code = PROBE.format(backend=str(BACKEND_DIR), workdir=str(tmp_path), ocr_modules=OCR_MODULES)
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    line = next(line for line in output.splitlines() if line.startswith("__STARTUP__"))
+    assert json.loads(line[len("__STARTUP__"):])["ocr_modules_loaded"] == []
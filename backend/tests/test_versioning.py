@@ -0,0 +1,81 @@
+"""List ETags come from per-collection versions bumped with every write."""
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI, Request, Response
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import versioning
+from models import Base, CollectionVersion
+
+USER_ID = 1
+
+
+@pytest.fixture
+def Session(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'versions.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+@pytest.fixture
+def client(Session):
+    """A list endpoint and a write endpoint wired like the ones in main"""
+    app = FastAPI()
+
+    @app.get("/documents")
+    def list_documents(request: Request, response: Response):
+        with Session() as db:
+            not_modified = versioning.not_modified_response(request, response, db, USER_ID, versioning.DOCUMENTS)
+            return not_modified or []
+
+    @app.post("/documents")
+    def add_document():
+        with Session() as db:
+            versioning.bump_version(db, USER_ID, versioning.DOCUMENTS)
+            db.commit()
+
+    def send(method, headers=None):
+        async def call():
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+                return await http.request(method, "/documents", headers=headers)
+        return asyncio.run(call())
+
+    return send
+
+
+def test_first_bump_inserts_the_counter_and_later_bumps_increment_it(Session):
+    with Session() as db:
+        assert versioning.get_version(db, USER_ID, versioning.DOCUMENTS) == 0
+        versioning.bump_version(db, USER_ID, versioning.DOCUMENTS, versioning.W2_FORMS)
+        db.commit()
+        assert db.query(CollectionVersion).filter(CollectionVersion.user_id == USER_ID).count() == 2
+
+        versioning.bump_version(db, USER_ID, versioning.DOCUMENTS)
+        db.commit()
+        assert versioning.get_version(db, USER_ID, versioning.DOCUMENTS) == 2
+        assert versioning.get_version(db, USER_ID, versioning.W2_FORMS) == 1
+
+
+def test_current_etag_gets_304(client):
+    etag = client("GET").headers["etag"]
+
+    response = client("GET", headers={"If-None-Match": etag})
+
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+    # Strong form of the same tag, as some proxies send it
+    assert client("GET", headers={"If-None-Match": etag[2:]}).status_code == 304
+
+
+def test_old_etag_gets_200_after_a_write(client):
+    etag = client("GET").headers["etag"]
+    client("POST")
+
+    response = client("GET", headers={"If-None-Match": etag})
+
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
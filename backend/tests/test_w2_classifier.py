@@ -0,0 +1,90 @@
+"""W2Classifier decisions, and parity with the substring check it replaced."""
+import random
+
+from services.w2_classifier import (
+    ACCEPT, REJECT, UNDECIDED, W2_REJECT_AFTER_PAGES, W2_REJECT_MAX_PAGES, W2Classifier,
+)
+
+W2_PAGE = "Form W-2 Wage and Tax Statement\nEmployer identification number 12-3456789\n"
+COVER_PAGE = "Payroll department\nPlease keep this packet for your records.\n"
+
+
+def substring_is_w2(text: str) -> bool:
+    """is_w2_document before the classifier: three of these substrings"""
+    w2_indicators = [
+        "wage and tax statement",
+        "form w-2",
+        "w-2",
+        "employer identification number",
+        "wages, tips, other compensation",
+        "federal income tax withheld",
+        "social security wages",
+        "medicare wages"
+    ]
+    text_lower = text.lower()
+    matches = sum(1 for indicator in w2_indicators if indicator in text_lower)
+    return matches >= 3
+
+
+def _random_text(rng: random.Random) -> str:
+    fragments = [
+        "Wage and Tax Statement", "Form W-2", "W-2", "w-2c", "Form  W-2", "Employer identification number",
+        "Wages, tips, other compensation", "Wages,tips, other compensation", "Federal income tax withheld",
+        "Social security wages", "Medicare wages", "Medicare wages and tips", "Form 1099-NEC", "Receipt",
+        "Invoice", "Bank statement", "Copy B", "OMB No. 1545-0008", "12-3456789", "$52,340.00", "\n", " ",
+    ]
+    parts = [rng.choice(fragments) for _ in range(rng.randint(0, 12))]
+    text = rng.choice(["", " ", "\n", " - "]).join(parts)
+    return "".join(c.upper() if rng.random() < 0.2 else c for c in text)
+
+
+def test_matches_the_substring_check_on_random_text():
+    rng = random.Random(2024)
+    for _ in range(5000):
+        text = _random_text(rng)
+        assert (W2Classifier().feed(text) == ACCEPT) == substring_is_w2(text), text
+
+
+def test_three_indicators_accept():
+    classifier = W2Classifier(page_count=1)
+    assert classifier.feed(W2_PAGE) == ACCEPT
+    assert classifier.is_w2()
+
+
+def test_two_indicators_stay_undecided():
+    assert W2Classifier(page_count=2).feed("Form W-2\nCopy B") == UNDECIDED
+
+
+def test_short_documents_with_another_form_title_are_rejected():
+    classifier = W2Classifier(page_count=W2_REJECT_MAX_PAGES)
+    assert classifier.feed("Form 1099-NEC Nonemployee Compensation") == REJECT
+
+
+def test_long_documents_with_another_form_title_are_not_rejected():
+    classifier = W2Classifier(page_count=W2_REJECT_MAX_PAGES + 6)
+    assert classifier.feed("Form 1099-INT Interest Income") == UNDECIDED
+    assert classifier.feed(W2_PAGE) == ACCEPT
+
+
+def test_cover_pages_without_indicators_are_rejected():
+    classifier = W2Classifier(page_count=20)
+    for _ in range(W2_REJECT_AFTER_PAGES - 1):
+        assert classifier.feed(COVER_PAGE) == UNDECIDED
+    # Blank pages do not count towards the limit
+    assert classifier.feed("  \n") == UNDECIDED
+    assert classifier.feed(COVER_PAGE) == REJECT
+
+
+def test_a_w2_after_cover_pages_is_accepted():
+    classifier = W2Classifier(page_count=20)
+    for _ in range(W2_REJECT_AFTER_PAGES - 1):
+        classifier.feed(COVER_PAGE)
+    assert classifier.feed(W2_PAGE) == ACCEPT
+
+
+def test_decisions_are_final_until_reset():
+    classifier = W2Classifier(page_count=1)
+    assert classifier.feed("Receipt") == REJECT
+    assert classifier.feed(W2_PAGE) == REJECT
+    classifier.reset()
+    assert classifier.feed(W2_PAGE) == ACCEPT
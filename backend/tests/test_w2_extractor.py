@@ -0,0 +1,69 @@
+"""W-2 extraction: every form in a packet is found once, and what is dropped is logged."""
+import random
+
+import pytest
+
+from services.w2_extractor import W2Extractor
+
+pytest.importorskip("cv2")  # benchmarks.w2_corpus renders images as well
+from benchmarks.w2_corpus import random_w2, w2_lines, write_text_pdf  # noqa: E402
+
+COPIES = ("Copy B", "Copy C", "Copy 2")
+
+
+def _ssns(result):
+    return sorted(form['extracted_fields'].get('employee_ssn') for form in result['forms'])
+
+
+def test_packet_with_one_employee_per_page_reads_every_page(tmp_path):
+    rng = random.Random(3)
+    employees = [random_w2(rng) for _ in range(2)]
+    # Copies B, C and 2 of one employee per page
+    pages = [[line for label in COPIES for line in w2_lines(fields, label)] for fields in employees]
+    path = tmp_path / "packet.pdf"
+    write_text_pdf(path, pages)
+
+    result = W2Extractor().process_document(str(path))
+
+    assert result['is_w2']
+    assert result['pages_read'] == 2
+    assert _ssns(result) == sorted(fields['employee_ssn'] for fields in employees)
+
+
+def _page(*copies):
+    return "\n".join(line for fields, label in copies for line in w2_lines(fields, label))
+
+
+def test_each_employee_on_a_shared_page_is_a_separate_form():
+    rng = random.Random(5)
+    first, second = random_w2(rng), random_w2(rng)
+
+    forms = W2Extractor().extract_w2_forms([_page((first, "Copy B"), (second, "Copy B"))], [95.0])
+
+    assert [form['extracted_fields']['employee_ssn'] for form in forms] == [first['employee_ssn'], second['employee_ssn']]
+    assert forms[1]['extracted_fields']['wages_tips_compensation'] == second['wages_tips_compensation']
+
+
+def test_duplicate_copies_collapse_into_one_form():
+    fields = random_w2(random.Random(6))
+    pages = [_page(*[(fields, label) for label in COPIES]), _page((fields, "Copy 2"))]
+
+    forms = W2Extractor().extract_w2_forms(pages, [90.0, 80.0])
+
+    assert len(forms) == 1
+    assert forms[0]['pages'] == [1, 1, 1, 2]
+    assert forms[0]['extracted_fields']['employee_ssn'] == fields['employee_ssn']
+
+
+def test_pages_and_segments_without_a_w2_are_dropped_and_logged(caplog):
+    fields = random_w2(random.Random(7))
+    cover = "Your 2023 tax documents\nKeep this page for your records"
+    # A trailing copy header with nothing but a year after it
+    w2_page = _page((fields, "Copy B")) + f"\na Employee's social security number\nForm W-2 {fields['tax_year']}"
+
+    with caplog.at_level("INFO", logger="services.w2_extractor"):
+        forms = W2Extractor().extract_w2_forms([cover, w2_page], [0.0, 90.0])
+
+    assert [form['page'] for form in forms] == [2]
+    assert "Skipping page 1" in caplog.text
+    assert "Dropping a segment on page 2" in caplog.text
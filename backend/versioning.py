@@ -0,0 +1,79 @@
+"""Per-user, per-collection change versions used as list ETags.
+
+Every write that changes what a list endpoint returns bumps the user's
+counter for that collection in the same transaction. List endpoints read the
+counter (a primary-key lookup) before touching the rows and answer
+``If-None-Match`` with 304 when it has not moved.
+"""
+from typing import Optional
+
+from fastapi import Request, Response
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from models import CollectionVersion
+
+DOCUMENTS = "documents"
+W2_FORMS = "w2_forms"
+TAX_RETURNS = "tax_returns"
+
+
+def bump_version(db: Session, user_id: int, *collections: str) -> None:
+    """Increment the version of each collection; commit with the write it describes"""
+    for collection in collections:
+        statement = (
+            update(CollectionVersion)
+            .where(CollectionVersion.user_id == user_id, CollectionVersion.collection == collection)
+            .values(version=CollectionVersion.version + 1)
+            .execution_options(synchronize_session=False)
+        )
+        if db.execute(statement).rowcount:
+            continue
+
+        # First write to this collection: create the counter, tolerating a concurrent insert
+        try:
+            with db.begin_nested():
+                db.add(CollectionVersion(user_id=user_id, collection=collection, version=1))
+        except IntegrityError:
+            db.execute(statement)
+
+
+def get_version(db: Session, user_id: int, collection: str) -> int:
+    version = db.query(CollectionVersion.version).filter(
+        CollectionVersion.user_id == user_id,
+        CollectionVersion.collection == collection
+    ).scalar()
+    return version or 0
+
+
+def make_etag(user_id: int, collection: str, version: int) -> str:
+    return f'W/"{collection}-{user_id}-{version}"'
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    # Weak comparison: W/"x" and "x" are equivalent for If-None-Match
+    bare = etag[2:] if etag.startswith("W/") else etag
+    return "*" in candidates or any(
+        (candidate[2:] if candidate.startswith("W/") else candidate) == bare for candidate in candidates
+    )
+
+
+def not_modified_response(request: Request, response: Response, db: Session,
+                          user_id: int, collection: str) -> Optional[Response]:
+    """Return a 304 if the client's ETag is current, otherwise set the ETag on `response`.
+
+    Must run before the rows are read so a concurrent write can only make the
+    ETag older than the data, never newer.
+    """
+    etag = make_etag(user_id, collection, get_version(db, user_id, collection))
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    response.headers.update(headers)
+    return None
@@ -0,0 +1,53 @@
+"""Extraction worker entry point.
+
+Run the API with ``EXTRACTION_MODE=worker`` so uploads are only recorded as
+pending, and run one or more of these processes next to it:
+
+    python worker.py
+
+Each worker polls for pending documents, claims one at a time and runs the
+OCR pipeline on it. Documents whose worker died mid-job are claimed again
+once their lease (EXTRACTION_LEASE_SECONDS) runs out, up to
+EXTRACTION_MAX_ATTEMPTS times. Only this process imports the OCR stack.
+"""
+import os
+import signal
+import time
+
+import extraction
+from database import SessionLocal
+
+POLL_INTERVAL_SECONDS = float(os.getenv("WORKER_POLL_INTERVAL", "2"))
+
+_running = True
+
+
+def _stop(signum, frame):
+    global _running
+    print(f"Received signal {signum}, finishing current document...")
+    _running = False
+
+
+def run():
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, _stop)
+
+    print(f"OCR stack loaded in {extraction.preload():.2f}s")
+    print(f"🚀 Extraction worker started (poll={POLL_INTERVAL_SECONDS}s)")
+
+    while _running:
+        with SessionLocal() as db:
+            # One at a time: a claimed document waiting behind others would age towards its lease
+            jobs = extraction.claim_pending_documents(db, 1)
+            for document_id, file_path in jobs:
+                status = extraction.extract_document(document_id, file_path, db)
+                print(f"Document {document_id}: {status}")
+
+        if not jobs:
+            time.sleep(POLL_INTERVAL_SECONDS)
+
+    print("Extraction worker stopped")
+
+
+if __name__ == "__main__":
+    run()